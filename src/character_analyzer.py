@@ -6,12 +6,15 @@ import os
 import re
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from dataclasses import dataclass, asdict
-from collections import defaultdict
+from collections import Counter, defaultdict
+from functools import lru_cache
+from heapq import nlargest
+from operator import itemgetter
 
 
-@dataclass
+@dataclass(slots=True)
 class CharacterTraits:
     """Character traits detected from text"""
     name: str
@@ -23,14 +26,23 @@ class CharacterTraits:
     first_appearance: int = -1  # Segment number
     
     def to_dict(self):
-        return asdict(self)
+        # Flat fields only, so skip asdict()'s recursive deep copy
+        return {
+            'name': self.name,
+            'gender': self.gender,
+            'demeanor': self.demeanor,
+            'appearances': self.appearances,
+            'dialogue_count': self.dialogue_count,
+            'thought_count': self.thought_count,
+            'first_appearance': self.first_appearance
+        }
     
     @classmethod
     def from_dict(cls, data):
         return cls(**data)
 
 
-@dataclass
+@dataclass(slots=True)
 class EmotionalState:
     """Emotional state for a text segment"""
     dominant_emotion: str  # happy, sad, angry, afraid, surprised, disgusted, neutral
@@ -45,8 +57,14 @@ class EmotionalState:
         return cls(**data)
 
 
-@dataclass
-class CharacterSegment:
+class _WordCountSlots:
+    """Slots for CharacterSegment's word-count cache, kept out of the dataclass fields
+    so asdict() and fields() only see the serialized attributes"""
+    __slots__ = ('_word_count', '_word_count_text')
+
+
+@dataclass(slots=True)
+class CharacterSegment(_WordCountSlots):
     """A text segment with character and emotion information"""
     segment_id: int
     text: str
@@ -56,10 +74,30 @@ class CharacterSegment:
     is_narration: bool
     emotional_state: EmotionalState
     
+    def __post_init__(self):
+        # Cached word count and the text it was computed from (internal, not serialized)
+        self._word_count = 0
+        self._word_count_text = None
+    
+    @property
+    def word_count(self) -> int:
+        """Number of words in text, cached until text is replaced"""
+        text = self.text
+        if self._word_count_text is not text:
+            self._word_count = len(text.split())
+            self._word_count_text = text
+        return self._word_count
+    
     def to_dict(self):
-        data = asdict(self)
-        data['emotional_state'] = self.emotional_state.to_dict()
-        return data
+        return {
+            'segment_id': self.segment_id,
+            'text': self.text,
+            'character': self.character,
+            'is_dialogue': self.is_dialogue,
+            'is_thought': self.is_thought,
+            'is_narration': self.is_narration,
+            'emotional_state': self.emotional_state.to_dict()
+        }
     
     @classmethod
     def from_dict(cls, data):
@@ -92,6 +130,17 @@ class CharacterAnalyzer:
         r'([A-Z][a-z]+):\s+"',  # Name: "dialogue"
     ]
     
+    # Precompiled forms of the patterns above (same order, same priority)
+    _DIALOGUE_RES = [re.compile(p) for p in DIALOGUE_PATTERNS]
+    _THOUGHT_RES = [re.compile(p) for p in THOUGHT_PATTERNS]
+    _SPEAKER_RES = [re.compile(p) for p in SPEAKER_PATTERNS]
+    
+    # Cleanup and extraction of Ollama responses
+    _THINK_BLOCK_RE = re.compile(r'<think>.*?</think>', re.DOTALL | re.IGNORECASE)
+    _THINK_TAG_RE = re.compile(r'</?think>', re.IGNORECASE)
+    _BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+    _JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)  # First '[' through last ']'
+    
     # Emotion keywords
     EMOTION_KEYWORDS = {
         'happy': ['happy', 'joy', 'delighted', 'pleased', 'cheerful', 'glad', 'smiled', 'laughed', 'grinned', 'chuckled'],
@@ -104,11 +153,32 @@ class CharacterAnalyzer:
         'melancholic': ['melancholy', 'wistful', 'nostalgic', 'pensive', 'reflective', 'somber', 'gloomy'],
     }
     
+    # Emotion vector layout expected by IndexTTS2
+    EMOTION_NAMES = ('happy', 'angry', 'sad', 'afraid', 'disgusted', 'melancholic', 'surprised', 'calm')
+    EMOTION_INDEX = {name: i for i, name in enumerate(EMOTION_NAMES)}
+    
+    # Vector indices in EMOTION_KEYWORDS order (ties for the dominant emotion resolve in this order)
+    _EMOTION_PRIORITY = tuple(map(EMOTION_NAMES.index, EMOTION_KEYWORDS))
+    
+    # Keyword -> emotion vector index; text is tokenized once and each word looked up,
+    # which matches keywords on word boundaries (unlike substring counting)
+    _EMOTION_ID_BY_KEYWORD = {
+        keyword: emotion_id
+        for emotion_id, keywords in zip(_EMOTION_PRIORITY, EMOTION_KEYWORDS.values())
+        for keyword in keywords
+    }
+    _WORD_RE = re.compile(r'\w+')
+    
     # Gender indicators (simple heuristics)
     MALE_INDICATORS = ['he', 'him', 'his', 'mr', 'sir', 'lord', 'king', 'prince', 'brother', 'father', 'son', 'man', 'boy', 'gentleman']
     FEMALE_INDICATORS = ['she', 'her', 'hers', 'mrs', 'ms', 'miss', 'lady', 'queen', 'princess', 'sister', 'mother', 'daughter', 'woman', 'girl']
     
-    def __init__(self, use_ollama: bool = False, ollama_url: str = "http://host.docker.internal:11434", ollama_model: str = "aratan/DeepSeek-R1-32B-Uncensored:latest", work_dir: str = "./work"):
+    # Pronoun families for speaker resolution (matched as whole words)
+    MALE_PRONOUNS = frozenset({'he', 'him', 'his'})
+    FEMALE_PRONOUNS = frozenset({'she', 'her', 'hers'})
+    FIRST_PERSON_PRONOUNS = frozenset({'i', 'my', 'me', 'myself'})
+    
+    def __init__(self, use_ollama: bool = False, ollama_url: str = "http://host.docker.internal:11434", ollama_model: str = "aratan/DeepSeek-R1-32B-Uncensored:latest", work_dir: str = "./work", save_artifacts: bool = True):
         """
         Initialize character analyzer
         
@@ -117,16 +187,20 @@ class CharacterAnalyzer:
             ollama_url (str): Ollama API URL
             ollama_model (str): Ollama model to use
             work_dir (str): Working directory to save artifacts
+            save_artifacts (bool): Save per-window Ollama prompts/inputs/outputs to work_dir
         """
         self.use_ollama = use_ollama
         self.ollama_url = ollama_url
         self.ollama_model = ollama_model
         self.work_dir = work_dir
+        self.save_artifacts = save_artifacts and bool(work_dir)
         self.characters: Dict[str, CharacterTraits] = {}
         self.pronoun_map: Dict[str, str] = {}  # Maps pronouns to character names in context
+        self._name_regex: Dict[str, re.Pattern] = {}  # Compiled word-boundary pattern per name
+        self._all_names_re: Optional[re.Pattern] = None  # Alternation of all character names
         
         # Create artifact directories if using Ollama
-        if self.use_ollama and self.work_dir:
+        if self.use_ollama and self.save_artifacts:
             self.char_prompts_dir = os.path.join(self.work_dir, "ollama_characters", "prompts")
             self.char_inputs_dir = os.path.join(self.work_dir, "ollama_characters", "inputs")
             self.char_outputs_dir = os.path.join(self.work_dir, "ollama_characters", "outputs")
@@ -162,20 +236,35 @@ class CharacterAnalyzer:
         Returns:
             str: Text with <think> tags and their content removed
         """
-        import re
-        
-        # Remove <think>...</think> blocks (including newlines within)
-        cleaned_text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL | re.IGNORECASE)
+        cleaned_text = text
         
-        # Remove any standalone opening or closing think tags
-        cleaned_text = re.sub(r'</?think>', '', cleaned_text, flags=re.IGNORECASE)
+        # Only run the removal passes when the response has any think tag at all
+        if self._THINK_TAG_RE.search(cleaned_text):
+            # Remove <think>...</think> blocks (including newlines within)
+            cleaned_text = self._THINK_BLOCK_RE.sub('', cleaned_text)
+            
+            # Remove any standalone opening or closing think tags
+            cleaned_text = self._THINK_TAG_RE.sub('', cleaned_text)
         
         # Clean up excessive whitespace
-        cleaned_text = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned_text)
+        cleaned_text = self._BLANK_LINES_RE.sub('\n\n', cleaned_text)
         cleaned_text = cleaned_text.strip()
         
         return cleaned_text
     
+    def _extract_json_array(self, text: str) -> Optional[str]:
+        """
+        Find the JSON array in an Ollama response
+        
+        Args:
+            text (str): Response text with <think> tags already removed
+            
+        Returns:
+            str: Text from the first '[' through the last ']', or None if there is none
+        """
+        match = self._JSON_ARRAY_RE.search(text)
+        return match.group(0) if match else None
+    
     def _split_text_into_segments(self, text: str, target_chars: int = 3000) -> List[str]:
         """
         Split text into segments for Ollama processing
@@ -187,27 +276,35 @@ class CharacterAnalyzer:
         Returns:
             List of text segments
         """
-        # Split by paragraphs first
-        paragraphs = text.split('\n\n')
-        
+        # Walk paragraph boundaries by offset and slice segments straight out of
+        # the text, instead of splitting into paragraphs and re-joining them
         segments = []
-        current_segment = []
+        text_length = len(text)
+        segment_start = 0
+        para_start = 0
         current_length = 0
+        has_paragraph = False
         
-        for para in paragraphs:
-            para_length = len(para)
+        while True:
+            para_end = text.find('\n\n', para_start)
+            if para_end < 0:
+                para_end = text_length
+            para_length = para_end - para_start
             
-            if current_length + para_length > target_chars and current_segment:
-                # Save current segment
-                segments.append('\n\n'.join(current_segment))
-                current_segment = [para]
+            if current_length + para_length > target_chars and has_paragraph:
+                # Save current segment (up to the separator before this paragraph)
+                segments.append(text[segment_start:para_start - 2])
+                segment_start = para_start
                 current_length = para_length
             else:
-                current_segment.append(para)
+                has_paragraph = True
                 current_length += para_length + 2  # +2 for \n\n
+            
+            if para_end == text_length:
+                break
+            para_start = para_end + 2
         
-        if current_segment:
-            segments.append('\n\n'.join(current_segment))
+        segments.append(text[segment_start:])
         
         return segments
         
@@ -224,15 +321,15 @@ class CharacterAnalyzer:
         segments = []
         
         # Find all dialogue
-        for pattern in self.DIALOGUE_PATTERNS:
-            for match in re.finditer(pattern, text):
+        for pattern in self._DIALOGUE_RES:
+            for match in pattern.finditer(text):
                 dialogue_text = match.group(1)
                 speaker = self._find_speaker_near_match(text, match.start(), match.end())
                 segments.append((dialogue_text, speaker, True, False))
         
         # Find all thoughts
-        for pattern in self.THOUGHT_PATTERNS:
-            for match in re.finditer(pattern, text):
+        for pattern in self._THOUGHT_RES:
+            for match in pattern.finditer(text):
                 thought_text = match.group(1)
                 # Thoughts are usually attributed to the viewpoint character
                 thinker = self._find_speaker_near_match(text, match.start(), match.end())
@@ -260,8 +357,8 @@ class CharacterAnalyzer:
         dialogue_text = text[start:end]
         
         # Try to find speaker by name
-        for pattern in self.SPEAKER_PATTERNS:
-            match = re.search(pattern, context)
+        for pattern in self._SPEAKER_RES:
+            match = pattern.search(context)
             if match:
                 speaker_name = match.group(1)
                 # Verify this is a known character
@@ -319,15 +416,18 @@ class CharacterAnalyzer:
             
             print("  Using Ollama for character detection...")
             
-            # Create work directories
-            char_work_dir = Path(self.work_dir) / "character_detection"
-            prompts_dir = char_work_dir / "prompts"
-            inputs_dir = char_work_dir / "inputs"
-            outputs_dir = char_work_dir / "outputs"
-            comparisons_dir = char_work_dir / "comparisons"
+            save_artifacts = self.save_artifacts
             
-            for dir_path in [prompts_dir, inputs_dir, outputs_dir, comparisons_dir]:
-                dir_path.mkdir(parents=True, exist_ok=True)
+            # Create work directories once, up front
+            if save_artifacts:
+                char_work_dir = Path(self.work_dir) / "character_detection"
+                prompts_dir = char_work_dir / "prompts"
+                inputs_dir = char_work_dir / "inputs"
+                outputs_dir = char_work_dir / "outputs"
+                comparisons_dir = char_work_dir / "comparisons"
+                
+                for dir_path in [prompts_dir, inputs_dir, outputs_dir, comparisons_dir]:
+                    dir_path.mkdir(parents=True, exist_ok=True)
             
             # Remove <think> tags
             cleaned_text = self._remove_think_tags(text)
@@ -371,15 +471,16 @@ Respond ONLY with a JSON array like this:
 
 Do not include narrators, places, or non-character entities. Only list actual characters (people)."""
                 
-                # Save prompt
-                prompt_file = prompts_dir / f"segment_{i+1:04d}_prompt.txt"
-                with open(prompt_file, 'w', encoding='utf-8') as f:
-                    f.write(prompt)
+                file_stem = f"segment_{i+1:04d}"
                 
-                # Save input text
-                input_file = inputs_dir / f"segment_{i+1:04d}_input.txt"
-                with open(input_file, 'w', encoding='utf-8') as f:
-                    f.write(window_text)
+                if save_artifacts:
+                    # Save prompt
+                    with open(prompts_dir / f"{file_stem}_prompt.txt", 'w', encoding='utf-8') as f:
+                        f.write(prompt)
+                    
+                    # Save input text
+                    with open(inputs_dir / f"{file_stem}_input.txt", 'w', encoding='utf-8') as f:
+                        f.write(window_text)
                 
                 try:
                     response = requests.post(
@@ -401,28 +502,26 @@ Do not include narrators, places, or non-character entities. Only list actual ch
                         response_text = self._remove_think_tags(response_text)
                         
                         # Save output
-                        output_file = outputs_dir / f"segment_{i+1:04d}_output.json"
-                        with open(output_file, 'w', encoding='utf-8') as f:
-                            f.write(response_text)
+                        if save_artifacts:
+                            with open(outputs_dir / f"{file_stem}_output.json", 'w', encoding='utf-8') as f:
+                                f.write(response_text)
                         
                         # Try to extract JSON from response
                         try:
                             # Find JSON array in response
-                            start = response_text.find('[')
-                            end = response_text.rfind(']') + 1
-                            if start >= 0 and end > start:
-                                json_str = response_text[start:end]
+                            json_str = self._extract_json_array(response_text)
+                            if json_str is not None:
                                 detected = json.loads(json_str)
                                 all_character_results.append(detected)
                                 
                                 # Save comparison file
-                                comparison_file = comparisons_dir / f"segment_{i+1:04d}_comparison.txt"
-                                with open(comparison_file, 'w', encoding='utf-8') as f:
-                                    f.write(f"=== Window: {window_label} ===\n\n")
-                                    f.write(f"Characters Detected:\n")
-                                    for char in detected:
-                                        f.write(f"  - {char.get('name', 'Unknown')} ({char.get('gender', 'unknown')})\n")
-                                        f.write(f"    Demeanor: {char.get('demeanor', 'N/A')}\n")
+                                if save_artifacts:
+                                    with open(comparisons_dir / f"{file_stem}_comparison.txt", 'w', encoding='utf-8') as f:
+                                        f.write(f"=== Window: {window_label} ===\n\n")
+                                        f.write(f"Characters Detected:\n")
+                                        for char in detected:
+                                            f.write(f"  - {char.get('name', 'Unknown')} ({char.get('gender', 'unknown')})\n")
+                                            f.write(f"    Demeanor: {char.get('demeanor', 'N/A')}\n")
                                 
                                 print(f"Processed {window_label}: {len(detected)} characters")
                             else:
@@ -431,11 +530,11 @@ Do not include narrators, places, or non-character entities. Only list actual ch
                         except json.JSONDecodeError as e:
                             print(f"Failed to parse JSON for {window_label}: {e}")
                             # Save error info
-                            comparison_file = comparisons_dir / f"segment_{i+1:04d}_comparison.txt"
-                            with open(comparison_file, 'w', encoding='utf-8') as f:
-                                f.write(f"=== Window: {window_label} ===\n\n")
-                                f.write(f"ERROR: Failed to parse JSON\n")
-                                f.write(f"Response: {response_text[:500]}\n")
+                            if save_artifacts:
+                                with open(comparisons_dir / f"{file_stem}_comparison.txt", 'w', encoding='utf-8') as f:
+                                    f.write(f"=== Window: {window_label} ===\n\n")
+                                    f.write(f"ERROR: Failed to parse JSON\n")
+                                    f.write(f"Response: {response_text[:500]}\n")
                     else:
                         print(f"Request failed for {window_label}: {response.status_code}")
                         
@@ -446,18 +545,19 @@ Do not include narrators, places, or non-character entities. Only list actual ch
             characters = self._merge_character_results(all_character_results, text)
             
             # Save final summary
-            summary_file = char_work_dir / "processing_summary.txt"
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                f.write(f"Character Detection Processing Summary\n")
-                f.write(f"======================================\n\n")
-                f.write(f"Total segments processed: {len(segments)}\n")
-                f.write(f"Successful analyses: {len(all_character_results)}\n")
-                f.write(f"Final merged characters: {len(characters)}\n\n")
-                f.write(f"Detected Characters:\n")
-                for name, traits in characters.items():
-                    f.write(f"  - {name} ({traits.gender})\n")
-                    f.write(f"    Demeanor: {traits.demeanor}\n")
-                    f.write(f"    Appearances: {traits.appearances}\n")
+            if save_artifacts:
+                summary_file = char_work_dir / "processing_summary.txt"
+                with open(summary_file, 'w', encoding='utf-8') as f:
+                    f.write(f"Character Detection Processing Summary\n")
+                    f.write(f"======================================\n\n")
+                    f.write(f"Total segments processed: {len(segments)}\n")
+                    f.write(f"Successful analyses: {len(all_character_results)}\n")
+                    f.write(f"Final merged characters: {len(characters)}\n\n")
+                    f.write(f"Detected Characters:\n")
+                    for name, traits in characters.items():
+                        f.write(f"  - {name} ({traits.gender})\n")
+                        f.write(f"    Demeanor: {traits.demeanor}\n")
+                        f.write(f"    Appearances: {traits.appearances}\n")
             
             print(f"Ollama detected {len(characters)} characters")
             
@@ -558,6 +658,10 @@ Do not include narrators, places, or non-character entities. Only list actual ch
                 continue
             word_counts[word] += 1
         
+        # Split and lowercase sentences once per book; shared by every character and the pronoun map
+        sentences = re.split(r'[.!?]', text)
+        sentences_lower = [s.lower() for s in sentences]
+        
         # Characters are names that appear multiple times
         characters = {}
         for name, count in word_counts.items():
@@ -568,34 +672,37 @@ Do not include narrators, places, or non-character entities. Only list actual ch
                 )
                 
                 # Detect gender
-                character.gender = self._detect_gender(text, name)
+                character.gender = self._detect_gender(text, name, sentences_lower)
                 
                 # Detect demeanor (basic heuristic)
-                character.demeanor = self._detect_demeanor(text, name)
+                character.demeanor = self._detect_demeanor(text, name, sentences_lower)
                 
                 characters[name] = character
         
         self.characters = characters
         
         # Build pronoun map
-        self._build_pronoun_map(text)
+        self._build_pronoun_map(text, sentences, sentences_lower)
         
         return characters
     
-    def _detect_gender(self, text: str, name: str) -> str:
+    def _detect_gender(self, text: str, name: str, sentences_lower: Optional[List[str]] = None) -> str:
         """
         Detect gender of a character from context
         
         Args:
             text (str): Full text
             name (str): Character name
+            sentences_lower (List[str]): Optional pre-split, lowercased sentences of text
             
         Returns:
             Gender: male, female, neutral, or unknown
         """
         # Find sentences containing the name
-        sentences = re.split(r'[.!?]', text)
-        relevant_sentences = [s.lower() for s in sentences if name.lower() in s.lower()]
+        if sentences_lower is None:
+            sentences_lower = [s.lower() for s in re.split(r'[.!?]', text)]
+        name_lower = name.lower()
+        relevant_sentences = [s for s in sentences_lower if name_lower in s]
         
         male_score = 0
         female_score = 0
@@ -617,20 +724,23 @@ Do not include narrators, places, or non-character entities. Only list actual ch
         else:
             return "unknown"
     
-    def _detect_demeanor(self, text: str, name: str) -> str:
+    def _detect_demeanor(self, text: str, name: str, sentences_lower: Optional[List[str]] = None) -> str:
         """
         Detect general demeanor of a character
         
         Args:
             text (str): Full text
             name (str): Character name
+            sentences_lower (List[str]): Optional pre-split, lowercased sentences of text
             
         Returns:
             Demeanor description
         """
         # Find sentences with the character
-        sentences = re.split(r'[.!?]', text)
-        relevant_sentences = [s.lower() for s in sentences if name.lower() in s.lower()]
+        if sentences_lower is None:
+            sentences_lower = [s.lower() for s in re.split(r'[.!?]', text)]
+        name_lower = name.lower()
+        relevant_sentences = [s for s in sentences_lower if name_lower in s]
         
         # Count emotion keywords in character's context
         emotion_scores = defaultdict(int)
@@ -647,18 +757,48 @@ Do not include narrators, places, or non-character entities. Only list actual ch
         dominant = max(emotion_scores.items(), key=lambda x: x[1])
         return dominant[0]
     
-    def _build_pronoun_map(self, text: str):
+    def _get_name_regex(self, name: str) -> re.Pattern:
+        """
+        Get the compiled case-insensitive word-boundary pattern for a character name
+        
+        Args:
+            name (str): Character name
+            
+        Returns:
+            Compiled regex pattern (cached per name)
+        """
+        pattern = self._name_regex.get(name)
+        if pattern is None:
+            pattern = re.compile(r'\b' + re.escape(name) + r'\b', re.IGNORECASE)
+            self._name_regex[name] = pattern
+        return pattern
+    
+    def _build_pronoun_map(self, text: str, sentences: Optional[List[str]] = None, sentences_lower: Optional[List[str]] = None):
         """
         Build a map of pronouns to character names based on context
         
         Args:
             text (str): Full text
+            sentences (List[str]): Optional pre-split sentences of text
+            sentences_lower (List[str]): Optional lowercased forms of sentences
         """
         if not self.characters:
             return
         
         # Split into sentences
-        sentences = re.split(r'[.!?]', text)
+        if sentences is None:
+            sentences = re.split(r'[.!?]', text)
+        if sentences_lower is None:
+            sentences_lower = [s.lower() for s in sentences]
+        
+        # One alternation over all names (longest first) so each sentence is scanned once
+        names_by_length = sorted(self.characters.keys(), key=len, reverse=True)
+        self._all_names_re = re.compile(
+            r'\b(' + '|'.join(re.escape(name) for name in names_by_length) + r')\b',
+            re.IGNORECASE
+        )
+        
+        names_lower = [(name, name.lower()) for name in self.characters.keys()]
         
         # Track last mentioned character per gender
         last_male = None
@@ -666,12 +806,10 @@ Do not include narrators, places, or non-character entities. Only list actual ch
         last_neutral = None
         last_any = None
         
-        for sentence in sentences:
-            # Find characters mentioned in this sentence
-            mentioned_chars = []
-            for name in self.characters.keys():
-                if re.search(r'\b' + re.escape(name) + r'\b', sentence, re.IGNORECASE):
-                    mentioned_chars.append(name)
+        for sentence, sentence_lower in zip(sentences, sentences_lower):
+            # Find characters mentioned in this sentence (kept in character order)
+            found = {match.lower() for match in self._all_names_re.findall(sentence)}
+            mentioned_chars = [name for name, name_lower in names_lower if name_lower in found] if found else []
             
             # Update last mentioned tracking
             for name in mentioned_chars:
@@ -686,23 +824,40 @@ Do not include narrators, places, or non-character entities. Only list actual ch
                     last_neutral = name
             
             # Map pronouns in this sentence to last mentioned character of that gender
-            sentence_lower = sentence.lower()
+            has_male, has_female, has_first_person = self._scan_pronouns(sentence_lower)
             
             # Male pronouns
-            if any(pronoun in sentence_lower for pronoun in ['he ', ' him ', ' his ']):
+            if has_male:
                 if last_male:
                     self.pronoun_map[sentence] = last_male
             
             # Female pronouns
-            elif any(pronoun in sentence_lower for pronoun in ['she ', ' her ', ' hers ']):
+            elif has_female:
                 if last_female:
                     self.pronoun_map[sentence] = last_female
             
             # Neutral/first person (map to last mentioned if only one character)
-            elif any(pronoun in sentence_lower for pronoun in [' i ', ' my ', ' me ']):
+            elif has_first_person:
                 if last_any and len(mentioned_chars) == 0:
                     self.pronoun_map[sentence] = last_any
     
+    def _scan_pronouns(self, text_lower: str) -> Tuple[bool, bool, bool]:
+        """
+        Detect male, female and first-person pronouns in one pass over the text
+        
+        Args:
+            text_lower (str): Lowercased text to scan
+            
+        Returns:
+            (has_male, has_female, has_first_person) tuple
+        """
+        words = set(self._WORD_RE.findall(text_lower))
+        return (
+            not words.isdisjoint(self.MALE_PRONOUNS),
+            not words.isdisjoint(self.FEMALE_PRONOUNS),
+            not words.isdisjoint(self.FIRST_PERSON_PRONOUNS),
+        )
+    
     def resolve_pronoun_to_character(self, text: str, context: str = None) -> Optional[str]:
         """
         Resolve a pronoun in text to a character name
@@ -714,30 +869,34 @@ Do not include narrators, places, or non-character entities. Only list actual ch
         Returns:
             Character name or None
         """
-        text_lower = text.lower()
-        
         # Check direct pronoun map
         for sentence, char in self.pronoun_map.items():
             if text in sentence or sentence in text:
                 return char
         
         # Analyze pronouns in text
-        has_male = any(p in text_lower for p in ['he ', ' him ', ' his '])
-        has_female = any(p in text_lower for p in ['she ', ' her ', ' hers '])
-        has_first_person = any(p in text_lower for p in [' i ', ' my ', ' me ', ' myself '])
+        has_male, has_female, has_first_person = self._scan_pronouns(text.lower())
         
         # If context provided, look for last mentioned character
         if context:
-            for name in self.characters.keys():
-                if re.search(r'\b' + re.escape(name) + r'\b', context, re.IGNORECASE):
-                    char_gender = self.characters[name].gender
-                    
-                    if has_male and char_gender == 'male':
-                        return name
-                    elif has_female and char_gender == 'female':
-                        return name
-                    elif has_first_person:
-                        return name
+            # Decide up front which genders can match; first person accepts any character
+            if has_first_person:
+                accepted_genders = None
+            else:
+                accepted_genders = set()
+                if has_male:
+                    accepted_genders.add('male')
+                if has_female:
+                    accepted_genders.add('female')
+                if not accepted_genders:
+                    return None
+            
+            for name, traits in self.characters.items():
+                # Cheap gender check before the regex search
+                if accepted_genders is not None and traits.gender not in accepted_genders:
+                    continue
+                if self._get_name_regex(name).search(context):
+                    return name
         
         return None
     
@@ -751,53 +910,84 @@ Do not include narrators, places, or non-character entities. Only list actual ch
         Returns:
             EmotionalState object
         """
-        text_lower = text.lower()
+        dominant_emotion, intensity, emotion_items = self._score_emotion(text)
+        
+        # Build a fresh state per call; callers may override fields on it
+        return EmotionalState(
+            dominant_emotion=dominant_emotion,
+            intensity=intensity,
+            emotions=dict(emotion_items)
+        )
+    
+    def analyze_emotions(self, texts: List[str]) -> List[EmotionalState]:
+        """
+        Analyze emotional states for a batch of text segments
+        
+        Each distinct text is scored once, however often it repeats in the batch.
+        
+        Args:
+            texts (List[str]): Text segments
+            
+        Returns:
+            List of EmotionalState objects, one per input text
+        """
+        scores = {text: self._score_emotion(text) for text in dict.fromkeys(texts)}
+        
+        return [
+            EmotionalState(
+                dominant_emotion=dominant_emotion,
+                intensity=intensity,
+                emotions=dict(emotion_items)
+            )
+            for dominant_emotion, intensity, emotion_items in map(scores.__getitem__, texts)
+        ]
+    
+    @classmethod
+    @lru_cache(maxsize=8192)
+    def _score_emotion(cls, text: str) -> Tuple[str, float, Tuple[Tuple[str, float], ...]]:
+        """
+        Score the emotions of a text segment (memoized by text)
         
-        # Count emotion keywords
-        emotion_scores = defaultdict(float)
+        Repeated phrases such as dialogue tags skip the keyword scan entirely.
+        Call _score_emotion.cache_clear() if EMOTION_KEYWORDS changes at runtime.
+        
+        Args:
+            text (str): Text segment
+            
+        Returns:
+            (dominant_emotion, intensity, emotion vector items) tuple
+        """
+        emotion_id_by_keyword = cls._EMOTION_ID_BY_KEYWORD
+        
+        # Count whole-word emotion keywords straight into a fixed-size vector
+        vector = [0] * len(cls.EMOTION_NAMES)
         total_keywords = 0
         
-        for emotion, keywords in self.EMOTION_KEYWORDS.items():
-            for keyword in keywords:
-                count = text_lower.count(keyword)
-                emotion_scores[emotion] += count
-                total_keywords += count
+        for word in cls._WORD_RE.findall(text.lower()):
+            emotion_id = emotion_id_by_keyword.get(word)
+            if emotion_id is not None:
+                vector[emotion_id] += 1
+                total_keywords += 1
         
         # Normalize scores
         if total_keywords > 0:
-            for emotion in emotion_scores:
-                emotion_scores[emotion] /= total_keywords
+            vector = [count / total_keywords for count in vector]
         else:
             # No emotion keywords found, default to neutral
-            emotion_scores['calm'] = 1.0
+            vector = [0.0] * len(cls.EMOTION_NAMES)
+            vector[cls.EMOTION_INDEX['calm']] = 1.0
         
         # Find dominant emotion
-        if emotion_scores:
-            dominant = max(emotion_scores.items(), key=lambda x: x[1])
-            dominant_emotion = dominant[0]
-            intensity = min(1.0, dominant[1] * 2)  # Scale intensity
-        else:
-            dominant_emotion = 'calm'
-            intensity = 0.5
+        dominant_index = max(cls._EMOTION_PRIORITY, key=vector.__getitem__)
+        dominant_emotion = cls.EMOTION_NAMES[dominant_index]
+        dominant_share = vector[dominant_index]
+        intensity = dominant_share * 2 if dominant_share < 0.5 else 1.0  # Scale intensity, clipped to 1.0
         
-        # Create emotion vector (8 emotions for IndexTTS2)
+        # Emotion vector (8 emotions for IndexTTS2)
         # [happy, angry, sad, afraid, disgusted, melancholic, surprised, calm]
-        emotion_vector = {
-            'happy': emotion_scores.get('happy', 0.0),
-            'angry': emotion_scores.get('angry', 0.0),
-            'sad': emotion_scores.get('sad', 0.0),
-            'afraid': emotion_scores.get('afraid', 0.0),
-            'disgusted': emotion_scores.get('disgusted', 0.0),
-            'melancholic': emotion_scores.get('melancholic', 0.0),
-            'surprised': emotion_scores.get('surprised', 0.0),
-            'calm': emotion_scores.get('calm', 0.0),
-        }
+        emotion_vector = tuple(zip(cls.EMOTION_NAMES, vector))
         
-        return EmotionalState(
-            dominant_emotion=dominant_emotion,
-            intensity=intensity,
-            emotions=emotion_vector
-        )
+        return dominant_emotion, intensity, emotion_vector
     
     def create_character_segments(self, text: str, base_segments: List[str]) -> List[CharacterSegment]:
         """
@@ -814,7 +1004,8 @@ Do not include narrators, places, or non-character entities. Only list actual ch
         if not self.characters:
             self.detect_characters(text)
         
-        character_segments = []
+        # Collect (segment_id, text, character, is_dialogue, is_thought, is_narration) first
+        pending = []
         
         for i, segment_text in enumerate(base_segments):
             # Extract dialogue/thoughts
@@ -823,32 +1014,27 @@ Do not include narrators, places, or non-character entities. Only list actual ch
             if dialogue_thoughts:
                 # Segment has dialogue/thoughts - create sub-segments
                 for dt_text, speaker, is_dialogue, is_thought in dialogue_thoughts:
-                    emotion = self.analyze_emotion(dt_text)
-                    
-                    char_seg = CharacterSegment(
-                        segment_id=i,
-                        text=dt_text,
-                        character=speaker,
-                        is_dialogue=is_dialogue,
-                        is_thought=is_thought,
-                        is_narration=False,
-                        emotional_state=emotion
-                    )
-                    character_segments.append(char_seg)
+                    pending.append((i, dt_text, speaker, is_dialogue, is_thought, False))
             else:
                 # Pure narration
-                emotion = self.analyze_emotion(segment_text)
-                
-                char_seg = CharacterSegment(
-                    segment_id=i,
-                    text=segment_text,
-                    character=None,
-                    is_dialogue=False,
-                    is_thought=False,
-                    is_narration=True,
-                    emotional_state=emotion
-                )
-                character_segments.append(char_seg)
+                pending.append((i, segment_text, None, False, False, True))
+        
+        # Score all segment texts in one batch
+        emotions = self.analyze_emotions([entry[1] for entry in pending])
+        
+        character_segments = [
+            CharacterSegment(
+                segment_id=segment_id,
+                text=seg_text,
+                character=character,
+                is_dialogue=is_dialogue,
+                is_thought=is_thought,
+                is_narration=is_narration,
+                emotional_state=emotion
+            )
+            for (segment_id, seg_text, character, is_dialogue, is_thought, is_narration), emotion
+            in zip(pending, emotions)
+        ]
         
         # Save debug file with annotated segments
         self._save_character_segments_debug(character_segments)
@@ -868,112 +1054,143 @@ Do not include narrators, places, or non-character entities. Only list actual ch
         debug_file = os.path.join(self.work_dir, "character_segments_debug.txt")
         
         try:
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                f.write("=" * 80 + "\n")
-                f.write("CHARACTER SEGMENTS DEBUG OUTPUT\n")
-                f.write("=" * 80 + "\n\n")
-                
-                f.write(f"Total Segments: {len(segments)}\n\n")
-                
-                # Count statistics
-                dialogue_count = sum(1 for s in segments if s.is_dialogue)
-                thought_count = sum(1 for s in segments if s.is_thought)
-                narration_count = sum(1 for s in segments if s.is_narration)
-                
-                f.write(f"Dialogue Segments: {dialogue_count}\n")
-                f.write(f"Thought Segments: {thought_count}\n")
-                f.write(f"Narration Segments: {narration_count}\n\n")
-                
-                # Character statistics
-                character_counts = defaultdict(int)
-                for seg in segments:
-                    if seg.character:
-                        character_counts[seg.character] += 1
-                
-                if character_counts:
-                    f.write("Character Appearances:\n")
-                    for char, count in sorted(character_counts.items(), key=lambda x: x[1], reverse=True):
-                        f.write(f"  - {char}: {count} segments\n")
-                    f.write("\n")
-                
-                f.write("=" * 80 + "\n\n")
-                
-                # Write each segment with annotations
-                for i, seg in enumerate(segments):
-                    f.write(f"SEGMENT {i+1:04d}\n")
-                    f.write("-" * 80 + "\n")
-                    
-                    # Type annotation
-                    if seg.is_dialogue:
-                        seg_type = "DIALOGUE"
-                    elif seg.is_thought:
-                        seg_type = "THOUGHT"
-                    elif seg.is_narration:
-                        seg_type = "NARRATION"
-                    else:
-                        seg_type = "UNKNOWN"
-                    
-                    f.write(f"Type: {seg_type}\n")
-                    
-                    # Character annotation
-                    if seg.character:
-                        f.write(f"Character: {seg.character}\n")
-                    else:
-                        f.write(f"Character: [NARRATOR]\n")
-                    
-                    # Emotion annotation
-                    f.write(f"Emotion: {seg.emotional_state.dominant_emotion} ")
-                    f.write(f"(intensity: {seg.emotional_state.intensity:.2f})\n")
-                    
-                    # Emotion vector
-                    if seg.emotional_state.emotions:
-                        top_emotions = sorted(
-                            seg.emotional_state.emotions.items(),
-                            key=lambda x: x[1],
-                            reverse=True
-                        )[:3]
-                        if top_emotions and top_emotions[0][1] > 0:
-                            emotion_str = ", ".join([f"{e}:{v:.2f}" for e, v in top_emotions if v > 0])
-                            f.write(f"Emotion Vector: {emotion_str}\n")
-                    
-                    f.write("\n")
-                    
-                    # Text content with visual separator
-                    f.write("TEXT:\n")
-                    f.write("┌" + "─" * 78 + "┐\n")
-                    
-                    # Wrap text at 76 characters
-                    text_lines = seg.text.split('\n')
-                    for line in text_lines:
-                        # Word wrap
-                        words = line.split()
-                        current_line = ""
-                        for word in words:
-                            if len(current_line) + len(word) + 1 <= 76:
-                                current_line += (" " if current_line else "") + word
-                            else:
-                                f.write(f"│ {current_line:<76} │\n")
-                                current_line = word
-                        if current_line:
-                            f.write(f"│ {current_line:<76} │\n")
-                    
-                    f.write("└" + "─" * 78 + "┘\n")
-                    f.write("\n\n")
-                
-                f.write("=" * 80 + "\n")
-                f.write("END OF CHARACTER SEGMENTS DEBUG OUTPUT\n")
-                f.write("=" * 80 + "\n")
+            # Stream the formatted lines through a large write buffer
+            with open(debug_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                f.writelines(self._iter_debug_lines(segments))
             
             print(f"  Saved character segments debug file: {debug_file}")
             
         except Exception as e:
             print(f"  Warning: Failed to save debug file: {e}")
     
+    def _iter_debug_lines(self, segments: List[CharacterSegment]) -> Iterator[str]:
+        """
+        Yield the annotated debug output for character segments piece by piece
+        
+        Args:
+            segments: List of CharacterSegment objects
+            
+        Yields:
+            Chunks of the debug file text
+        """
+        yield "=" * 80 + "\n"
+        yield "CHARACTER SEGMENTS DEBUG OUTPUT\n"
+        yield "=" * 80 + "\n\n"
+        
+        yield f"Total Segments: {len(segments)}\n\n"
+        
+        # Count type statistics in a single pass
+        dialogue_count = thought_count = narration_count = 0
+        for seg in segments:
+            dialogue_count += seg.is_dialogue
+            thought_count += seg.is_thought
+            narration_count += seg.is_narration
+        
+        character_counts = Counter(seg.character for seg in segments if seg.character)
+        
+        yield f"Dialogue Segments: {dialogue_count}\n"
+        yield f"Thought Segments: {thought_count}\n"
+        yield f"Narration Segments: {narration_count}\n\n"
+        
+        if character_counts:
+            yield "Character Appearances:\n"
+            for char, count in character_counts.most_common():
+                yield f"  - {char}: {count} segments\n"
+            yield "\n"
+        
+        yield "=" * 80 + "\n\n"
+        
+        # Write each segment with annotations
+        for i, seg in enumerate(segments):
+            yield f"SEGMENT {i+1:04d}\n"
+            yield "-" * 80 + "\n"
+            
+            # Type annotation
+            if seg.is_dialogue:
+                seg_type = "DIALOGUE"
+            elif seg.is_thought:
+                seg_type = "THOUGHT"
+            elif seg.is_narration:
+                seg_type = "NARRATION"
+            else:
+                seg_type = "UNKNOWN"
+            
+            yield f"Type: {seg_type}\n"
+            
+            # Character annotation
+            if seg.character:
+                yield f"Character: {seg.character}\n"
+            else:
+                yield f"Character: [NARRATOR]\n"
+            
+            # Emotion annotation
+            yield f"Emotion: {seg.emotional_state.dominant_emotion} "
+            yield f"(intensity: {seg.emotional_state.intensity:.2f})\n"
+            
+            # Emotion vector
+            if seg.emotional_state.emotions:
+                top_emotions = nlargest(3, seg.emotional_state.emotions.items(), key=itemgetter(1))
+                if top_emotions and top_emotions[0][1] > 0:
+                    emotion_str = ", ".join([f"{e}:{v:.2f}" for e, v in top_emotions if v > 0])
+                    yield f"Emotion Vector: {emotion_str}\n"
+            
+            yield "\n"
+            
+            # Text content with visual separator
+            yield "TEXT:\n"
+            yield "┌" + "─" * 78 + "┐\n"
+            
+            # Wrap text at 76 characters
+            for line in seg.text.split('\n'):
+                for wrapped in self._wrap_line(line, 76):
+                    yield f"│ {wrapped:<76} │\n"
+            
+            yield "└" + "─" * 78 + "┘\n"
+            yield "\n\n"
+        
+        yield "=" * 80 + "\n"
+        yield "END OF CHARACTER SEGMENTS DEBUG OUTPUT\n"
+        yield "=" * 80 + "\n"
+    
+    @staticmethod
+    def _wrap_line(line: str, width: int) -> List[str]:
+        """
+        Greedy word wrap (same output as textwrap.wrap with break_long_words=False)
+        
+        Args:
+            line (str): Single line of text
+            width (int): Maximum line width
+            
+        Returns:
+            List of wrapped lines (words longer than width get their own line)
+        """
+        words = line.split()
+        wrapped = []
+        start = 0
+        length = -1  # Length of the current line; -1 cancels the first separator
+        
+        for i, word in enumerate(words):
+            word_length = len(word)
+            if length + 1 + word_length > width and i > start:
+                wrapped.append(' '.join(words[start:i]))
+                start = i
+                length = word_length
+            else:
+                length += 1 + word_length
+        
+        if start < len(words):
+            wrapped.append(' '.join(words[start:]))
+        
+        return wrapped
+    
     def save_characters(self, filepath: str):
         """Save detected characters to JSON file"""
+        data = {name: char.to_dict() for name, char in self.characters.items()}
+        # Encode fully before opening so the file is written in one call
+        # (and an encoding error never truncates an existing file)
+        content = json.dumps(data, indent=2, ensure_ascii=False)
         with open(filepath, 'w', encoding='utf-8') as f:
-            data = {name: char.to_dict() for name, char in self.characters.items()}
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write(content)
     
     def load_characters(self, filepath: str):
         """Load characters from JSON file"""
@@ -991,13 +1208,15 @@ Do not include narrators, places, or non-character entities. Only list actual ch
             char2 (str): Character to merge into char1
         """
         if char1 in self.characters and char2 in self.characters:
-            # Merge appearances
-            self.characters[char1].appearances += self.characters[char2].appearances
-            self.characters[char1].dialogue_count += self.characters[char2].dialogue_count
-            self.characters[char1].thought_count += self.characters[char2].thought_count
+            # Remove char2 and fold its counts into char1
+            primary = self.characters[char1]
+            secondary = self.characters.pop(char2)
+            primary.appearances += secondary.appearances
+            primary.dialogue_count += secondary.dialogue_count
+            primary.thought_count += secondary.thought_count
             
-            # Remove char2
-            del self.characters[char2]
+            # Drop the merged name's cached pattern
+            self._name_regex.pop(char2, None)
             
             print(f"Merged '{char2}' into '{char1}'")
         else:
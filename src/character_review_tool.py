@@ -4,10 +4,15 @@ Allows merging characters, editing traits, and configuring voices
 """
 import json
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from character_analyzer import CharacterAnalyzer, CharacterTraits
 from character_voice_config import CharacterVoiceMapping, VoiceConfig
 
+try:
+    import readline
+except ImportError:  # Not available on Windows
+    readline = None
+
 
 class CharacterReviewTool:
     """Interactive tool for reviewing detected characters"""
@@ -21,6 +26,24 @@ class CharacterReviewTool:
         """
         self.analyzer = analyzer
         self.characters = analyzer.characters.copy()
+        
+        # Characters sorted by appearances; reset whenever characters are merged or removed
+        self._sorted_cache: Optional[List[Tuple[str, CharacterTraits]]] = None
+        self._completion_matches: List[str] = []
+        
+        # Tab-complete character names at the input prompts
+        if readline is not None:
+            readline.set_completer(self._complete_character_name)
+            readline.parse_and_bind('tab: complete')
+    
+    def _complete_character_name(self, text: str, state: int) -> Optional[str]:
+        """readline completer over the known character names"""
+        if state == 0:
+            self._completion_matches = [name for name in self.characters if name.startswith(text)]
+        
+        if state < len(self._completion_matches):
+            return self._completion_matches[state]
+        return None
     
     def display_characters(self):
         """Display all detected characters"""
@@ -32,12 +55,13 @@ class CharacterReviewTool:
             print("No characters detected.")
             return
         
-        # Sort by appearances
-        sorted_chars = sorted(self.characters.items(), 
-                            key=lambda x: x[1].appearances, 
-                            reverse=True)
+        # Sort by appearances (reused until the character list changes)
+        if self._sorted_cache is None:
+            self._sorted_cache = sorted(self.characters.items(), 
+                                        key=lambda x: x[1].appearances, 
+                                        reverse=True)
         
-        for i, (name, traits) in enumerate(sorted_chars, 1):
+        for i, (name, traits) in enumerate(self._sorted_cache, 1):
             print(f"\n{i}. {name}")
             print(f"   Gender: {traits.gender}")
             print(f"   Demeanor: {traits.demeanor}")
@@ -81,6 +105,7 @@ class CharacterReviewTool:
             if confirm == 'y':
                 self.analyzer.merge_characters(primary, secondary)
                 self.characters = self.analyzer.characters.copy()
+                self._sorted_cache = None
                 print(f"Merged '{secondary}' into '{primary}'")
                 self.display_characters()
     
@@ -142,6 +167,7 @@ class CharacterReviewTool:
             if confirm == 'y':
                 del self.characters[name]
                 del self.analyzer.characters[name]
+                self._sorted_cache = None
                 print(f"Removed '{name}'")
                 self.display_characters()
     
@@ -1,14 +1,65 @@
 """
 Enhanced text segmenter that segments by character and emotion
 """
+import os
 import re
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import repeat
 from typing import List, Tuple, Optional
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # Only needed for Ollama attribution
+    requests = None
+
 from character_analyzer import CharacterAnalyzer, CharacterSegment
 
 
 class CharacterAwareSegmenter:
     """Segment text based on characters, dialogue, and emotions"""
     
+    # Whitespace following sentence-ending punctuation
+    _SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.!?])\s+')
+    
+    # (is_dialogue, is_thought, is_narration) for each attribution type
+    _TYPE_FLAGS = {
+        'dialogue': (True, False, False),
+        'thought': (False, True, False),
+        'narration': (False, False, True),
+    }
+    
+    # Attribution prompts, filled in with str.format per request
+    _ATTRIBUTION_PROMPT = """Analyze this text segment and identify who is speaking or thinking in each part.
+
+Known characters: {known_characters}
+
+Text segment:
+{segment_text}
+
+For each distinct part of the text (dialogue, thought, or narration), provide:
+1. The exact text (copy it verbatim)
+2. Who is speaking/thinking (character name, or "NARRATOR" for narration)
+3. Type: "dialogue", "thought", or "narration"
+4. Dominant emotion: happy, sad, angry, afraid, surprised, disgusted, calm, or melancholic
+
+Respond ONLY with a JSON array like this:
+[
+  {{
+    "text": "exact text here",
+    "character": "CharacterName or NARRATOR",
+    "type": "dialogue",
+    "emotion": "happy"
+  }},
+  ...
+]
+
+IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactly ONE entry."""
+    
     def __init__(self, 
                  max_words_per_segment: int = 600,
                  min_words_per_segment: int = 50,
@@ -17,7 +68,9 @@ class CharacterAwareSegmenter:
                  use_ollama: bool = False,
                  ollama_url: str = "http://host.docker.internal:11434",
                  ollama_model: str = "aratan/DeepSeek-R1-32B-Uncensored:latest",
-                 work_dir: str = "./work"):
+                 work_dir: str = "./work",
+                 ollama_num_parallel: Optional[int] = None,
+                 save_artifacts: bool = True):
         """
         Initialize character-aware segmenter
         
@@ -30,6 +83,9 @@ class CharacterAwareSegmenter:
             ollama_url (str): Ollama API URL
             ollama_model (str): Ollama model to use
             work_dir (str): Working directory for artifacts
+            ollama_num_parallel (int): Concurrent Ollama requests; defaults to the
+                OLLAMA_NUM_PARALLEL environment variable (the Ollama server setting), or 1
+            save_artifacts (bool): Write prompts/responses/comparisons to work_dir
         """
         self.max_words = max_words_per_segment
         self.min_words = min_words_per_segment
@@ -39,11 +95,41 @@ class CharacterAwareSegmenter:
         self.ollama_url = ollama_url
         self.ollama_model = ollama_model
         self.work_dir = work_dir
+        self.save_artifacts = save_artifacts and bool(work_dir)
+        self._io_pool: Optional[ThreadPoolExecutor] = None  # Set while a segmentation run is active
+        if ollama_num_parallel is None:
+            try:
+                ollama_num_parallel = int(os.environ.get('OLLAMA_NUM_PARALLEL', 1))
+            except ValueError:
+                # Empty or non-numeric setting: fall back to sequential requests
+                ollama_num_parallel = 1
+        self.ollama_num_parallel = max(1, ollama_num_parallel)
+        
+        # One pooled session for all Ollama calls, so connections are kept alive
+        # between segments (sized for the parallel attribution requests)
+        self._http = None
+        if requests is not None:
+            adapter = HTTPAdapter(pool_maxsize=max(10, self.ollama_num_parallel), max_retries=3)
+            self._http = requests.Session()
+            self._http.mount('http://', adapter)
+            self._http.mount('https://', adapter)
+        elif use_ollama:
+            print("Warning: 'requests' is not installed, Ollama attribution will fall back to heuristics")
+        
+        # Artifact and cache locations (matching ollama_processor.py pattern)
+        if self.work_dir:
+            self.segmentation_dir = os.path.join(self.work_dir, "ollama_segmentation")
+            self.prompts_dir = os.path.join(self.segmentation_dir, "prompts")
+            self.original_text_dir = os.path.join(self.segmentation_dir, "original_text")
+            self.processed_text_dir = os.path.join(self.segmentation_dir, "processed_text")
+            self.cache_dir = os.path.join(self.segmentation_dir, "cache")
+        
         self.analyzer = CharacterAnalyzer(
             use_ollama=use_ollama,
             ollama_url=ollama_url,
             ollama_model=ollama_model,
-            work_dir=work_dir
+            work_dir=work_dir,
+            save_artifacts=save_artifacts
         )
     
     def segment_text(self, text: str, base_segments: List[str] = None) -> List[CharacterSegment]:
@@ -76,7 +162,7 @@ class CharacterAwareSegmenter:
         # Further split segments if they're too long
         final_segments = []
         for seg in char_segments:
-            if len(seg.text.split()) > self.max_words:
+            if seg.word_count > self.max_words:
                 # Split long segments
                 sub_segments = self._split_long_segment(seg)
                 final_segments.extend(sub_segments)
@@ -99,15 +185,16 @@ class CharacterAwareSegmenter:
         Returns:
             Deduplicated list
         """
-        seen_text = set()
+        # Keep 64-bit hashes of the normalized text rather than the text itself
+        seen_hashes = set()
         unique_segments = []
         
         for seg in segments:
             # Normalize text for comparison
-            normalized = seg.text.strip().lower()
+            text_hash = hash(seg.text.strip().lower())
             
-            if normalized not in seen_text:
-                seen_text.add(normalized)
+            if text_hash not in seen_hashes:
+                seen_hashes.add(text_hash)
                 unique_segments.append(seg)
             else:
                 print(f"  Warning: Skipping duplicate segment for {seg.character or 'NARRATOR'}")
@@ -118,6 +205,10 @@ class CharacterAwareSegmenter:
         """
         Use Ollama to intelligently segment text and attribute to characters
         
+        Up to ollama_num_parallel requests are in flight at once; results are
+        assembled in base segment order. Successful attributions are cached
+        under work_dir, so re-running the same book skips those requests.
+        
         Args:
             text (str): Full text
             base_segments (List[str]): Base text segments
@@ -125,202 +216,285 @@ class CharacterAwareSegmenter:
         Returns:
             List of CharacterSegment objects
         """
-        import requests
-        import json
-        import os
-        from datetime import datetime
-        
-        # Create artifact directories matching ollama_processor.py pattern
+        # Create directories once per run so workers only ever write files
         if self.work_dir:
-            self.prompts_dir = os.path.join(self.work_dir, "ollama_segmentation", "prompts")
-            self.original_text_dir = os.path.join(self.work_dir, "ollama_segmentation", "original_text")
-            self.processed_text_dir = os.path.join(self.work_dir, "ollama_segmentation", "processed_text")
-            
-            os.makedirs(self.prompts_dir, exist_ok=True)
-            os.makedirs(self.original_text_dir, exist_ok=True)
-            os.makedirs(self.processed_text_dir, exist_ok=True)
-        
-        char_segments = []
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if self.save_artifacts:
+                os.makedirs(self.prompts_dir, exist_ok=True)
+                os.makedirs(self.original_text_dir, exist_ok=True)
+                os.makedirs(self.processed_text_dir, exist_ok=True)
+        
+        per_segment = []  # CharacterSegments for each base segment, in order
+        failed = []  # Indices of base segments that need the heuristic fallback
         character_names = list(self.analyzer.characters.keys()) if self.analyzer.characters else []
+        total = len(base_segments)
         
         # Save session metadata
-        if self.work_dir:
-            metadata_file = os.path.join(self.work_dir, "ollama_segmentation", "session_metadata.txt")
+        if self.save_artifacts:
+            metadata_file = os.path.join(self.segmentation_dir, "session_metadata.txt")
             with open(metadata_file, 'w', encoding='utf-8') as f:
                 f.write(f"Character Segmentation Session\n")
                 f.write(f"{'='*80}\n")
                 f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"Model: {self.ollama_model}\n")
                 f.write(f"Ollama URL: {self.ollama_url}\n")
-                f.write(f"Total Base Segments: {len(base_segments)}\n")
+                f.write(f"Total Base Segments: {total}\n")
                 f.write(f"Known Characters: {', '.join(character_names) if character_names else 'None'}\n")
                 f.write(f"{'='*80}\n")
         
-        print(f"  Processing {len(base_segments)} segments with Ollama...")
+        known_characters = ', '.join(character_names) if character_names else 'None detected yet'
         
-        for i, segment_text in enumerate(base_segments):
-            # Build prompt for character attribution
-            prompt = f"""Analyze this text segment and identify who is speaking or thinking in each part.
-
-Known characters: {', '.join(character_names) if character_names else 'None detected yet'}
-
-Text segment:
-{segment_text}
-
-For each distinct part of the text (dialogue, thought, or narration), provide:
-1. The exact text (copy it verbatim)
-2. Who is speaking/thinking (character name, or "NARRATOR" for narration)
-3. Type: "dialogue", "thought", or "narration"
-4. Dominant emotion: happy, sad, angry, afraid, surprised, disgusted, calm, or melancholic
-
-Respond ONLY with a JSON array like this:
-[
-  {{
-    "text": "exact text here",
-    "character": "CharacterName or NARRATOR",
-    "type": "dialogue",
-    "emotion": "happy"
-  }},
-  ...
-]
-
-IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactly ONE entry."""
-            
-            # Save prompt if work_dir is specified
-            if self.work_dir:
-                prompt_file = os.path.join(self.prompts_dir, f"segment_{i+1:04d}_prompt.txt")
-                with open(prompt_file, 'w', encoding='utf-8') as f:
-                    f.write(prompt)
-            
-            # Save original text if work_dir is specified
-            if self.work_dir:
-                original_file = os.path.join(self.original_text_dir, f"segment_{i+1:04d}.txt")
-                with open(original_file, 'w', encoding='utf-8') as f:
-                    f.write(segment_text)
-            
+        print(f"  Processing {total} segments with Ollama ({self.ollama_num_parallel} in parallel)...")
+        
+        # Artifact files are written on a small background pool so request workers
+        # go straight back to Ollama; leaving the block waits for pending writes
+        with ThreadPoolExecutor(max_workers=4) as io_pool, \
+                ThreadPoolExecutor(max_workers=self.ollama_num_parallel) as executor:
+            self._io_pool = io_pool if self.save_artifacts else None
             try:
-                response = requests.post(
-                    f"{self.ollama_url}/api/generate",
-                    json={
-                        "model": self.ollama_model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "temperature": 0.3,
-                    },
-                    timeout=300
-                )
+                results = executor.map(self._attribute_segment, range(total), base_segments,
+                                       repeat(known_characters))
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    response_text = result.get('response', '')
-                    
-                    # Save the raw processed text with <think> tags (if any) to artifacts
-                    raw_processed_text = response_text if response_text else segment_text
-                    
-                    if self.work_dir:
-                        processed_file = os.path.join(self.processed_text_dir, f"segment_{i+1:04d}.txt")
-                        with open(processed_file, 'w', encoding='utf-8') as f:
-                            f.write(raw_processed_text)
+                for i, (segments, parts, error) in enumerate(results):
+                    per_segment.append(segments)
                     
-                    # Remove <think> tags
-                    response_text = self.analyzer._remove_think_tags(response_text)
-                    
-                    # Extract JSON
-                    start = response_text.find('[')
-                    end = response_text.rfind(']') + 1
-                    
-                    if start >= 0 and end > start:
-                        json_str = response_text[start:end]
-                        attributions = json.loads(json_str)
-                        
-                        for attr in attributions:
-                            text_part = attr.get('text', '').strip()
-                            if not text_part:
-                                continue
-                            
-                            char_name = attr.get('character', 'NARRATOR')
-                            if char_name == 'NARRATOR':
-                                char_name = None
-                            
-                            seg_type = attr.get('type', 'narration').lower()
-                            emotion_name = attr.get('emotion', 'calm').lower()
-                            
-                            # Create emotional state
-                            emotion_state = self.analyzer.analyze_emotion(text_part)
-                            # Override with Ollama's emotion
-                            emotion_state.dominant_emotion = emotion_name
-                            
-                            # Create segment
-                            char_seg = CharacterSegment(
-                                segment_id=i,
-                                text=text_part,
-                                character=char_name,
-                                is_dialogue=(seg_type == 'dialogue'),
-                                is_thought=(seg_type == 'thought'),
-                                is_narration=(seg_type == 'narration'),
-                                emotional_state=emotion_state
-                            )
-                            char_segments.append(char_seg)
-                        
-                        # Save comparison file
-                        if self.work_dir:
-                            comparison_file = os.path.join(self.work_dir, "ollama_segmentation", f"segment_{i+1:04d}_comparison.txt")
-                            with open(comparison_file, 'w', encoding='utf-8') as f:
-                                f.write("="*80 + "\n")
-                                f.write("ORIGINAL TEXT\n")
-                                f.write("="*80 + "\n")
-                                f.write(segment_text + "\n\n")
-                                f.write("="*80 + "\n")
-                                f.write("PROCESSED TEXT (with <think> tags if present)\n")
-                                f.write("="*80 + "\n")
-                                f.write(raw_processed_text + "\n\n")
-                                f.write("="*80 + "\n")
-                                f.write(f"CHARACTER ATTRIBUTION ({len(attributions)} parts)\n")
-                                f.write("="*80 + "\n")
-                                
-                                for idx, attr in enumerate(attributions, 1):
-                                    f.write(f"\nPART {idx}:\n")
-                                    f.write(f"  Character: {attr.get('character', 'NARRATOR')}\n")
-                                    f.write(f"  Type: {attr.get('type', 'narration')}\n")
-                                    f.write(f"  Emotion: {attr.get('emotion', 'calm')}\n")
-                                    f.write(f"  Text: {attr.get('text', '')}\n")
-                        
-                        print(f"    Segment {i+1}/{len(base_segments)}: {len(attributions)} parts attributed")
+                    if error is None:
+                        print(f"    Segment {i+1}/{total}: {parts} parts attributed")
                     else:
-                        # Fallback to heuristic
-                        print(f"    Segment {i+1}/{len(base_segments)}: Ollama failed, using heuristic")
-                        fallback_segs = self.analyzer.create_character_segments(segment_text, [segment_text])
-                        char_segments.extend(fallback_segs)
-                else:
-                    # Fallback to heuristic
-                    print(f"    Segment {i+1}/{len(base_segments)}: Ollama request failed (status {response.status_code}), using heuristic")
-                    fallback_segs = self.analyzer.create_character_segments(segment_text, [segment_text])
-                    char_segments.extend(fallback_segs)
-                    
-            except Exception as e:
-                print(f"    Segment {i+1}/{len(base_segments)}: Error ({e}), using heuristic")
-                fallback_segs = self.analyzer.create_character_segments(segment_text, [segment_text])
-                char_segments.extend(fallback_segs)
+                        print(f"    Segment {i+1}/{total}: {error}, using heuristic")
+                        failed.append(i)
+            finally:
+                self._io_pool = None
+        
+        # Fallback to heuristic for all failed segments in one pass (on this thread,
+        # as it updates the analyzer); each result goes back to its base segment
+        if failed:
+            fallback_segs = self.analyzer.create_character_segments(text, [base_segments[i] for i in failed])
+            for seg in fallback_segs:
+                seg.segment_id = failed[seg.segment_id]
+                per_segment[seg.segment_id].append(seg)
+        
+        char_segments = [seg for segments in per_segment for seg in segments]
         
         # Create processing summary
-        if self.work_dir:
-            summary_file = os.path.join(self.work_dir, "ollama_segmentation", "processing_summary.txt")
+        if self.save_artifacts:
+            summary_file = os.path.join(self.segmentation_dir, "processing_summary.txt")
             with open(summary_file, 'w', encoding='utf-8') as f:
                 f.write(f"Character Segmentation Processing Summary\n")
                 f.write(f"{'='*80}\n")
-                f.write(f"Total base segments processed: {len(base_segments)}\n")
+                f.write(f"Total base segments processed: {total}\n")
                 f.write(f"Total character segments created: {len(char_segments)}\n")
                 f.write(f"Model used: {self.ollama_model}\n")
                 f.write(f"\nArtifacts saved in:\n")
                 f.write(f"  - Prompts: {self.prompts_dir}\n")
                 f.write(f"  - Original text: {self.original_text_dir}\n")
                 f.write(f"  - Processed text: {self.processed_text_dir}\n")
-                f.write(f"  - Comparisons: {os.path.join(self.work_dir, 'ollama_segmentation')}\n")
+                f.write(f"  - Comparisons: {self.segmentation_dir}\n")
                 f.write(f"{'='*80}\n")
-            print(f"\nOllama segmentation artifacts saved to: {os.path.join(self.work_dir, 'ollama_segmentation')}")
+            print(f"\nOllama segmentation artifacts saved to: {self.segmentation_dir}")
         
         return char_segments
-
+    
+    def _attribute_segment(self, i: int, segment_text: str,
+                           known_characters: str) -> Tuple[List[CharacterSegment], int, Optional[str]]:
+        """
+        Ask Ollama to attribute one base segment to characters
+        
+        Runs on a worker thread, so it only writes this segment's artifacts
+        and leaves the heuristic fallback to the caller.
+        
+        Args:
+            i (int): Base segment index
+            segment_text (str): Base segment text
+            known_characters (str): Known character names for the prompt
+            
+        Returns:
+            (segments, parts attributed, error) tuple; error is None on success,
+            otherwise the reason the caller should fall back to the heuristic
+        """
+        # Build prompt for character attribution
+        prompt = self._ATTRIBUTION_PROMPT.format(known_characters=known_characters, segment_text=segment_text)
+        
+        # Save prompt and original text
+        if self.save_artifacts:
+            self._write_artifact(os.path.join(self.prompts_dir, f"segment_{i+1:04d}_prompt.txt"), prompt)
+            self._write_artifact(os.path.join(self.original_text_dir, f"segment_{i+1:04d}.txt"), segment_text)
+        
+        # Reuse the attribution from an earlier run of the same prompt
+        cached = self._load_cached_attribution(prompt)
+        if cached is not None:
+            raw_processed_text, attributions = cached
+            return self._segments_from_attributions(i, segment_text, raw_processed_text, attributions)
+        
+        try:
+            response = self._http.post(
+                f"{self.ollama_url}/api/generate",
+                json={
+                    "model": self.ollama_model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "temperature": 0.3,
+                },
+                timeout=300
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                response_text = result.get('response', '')
+                
+                # Save the raw processed text with <think> tags (if any) to artifacts
+                raw_processed_text = response_text if response_text else segment_text
+                
+                if self.save_artifacts:
+                    self._write_artifact(os.path.join(self.processed_text_dir, f"segment_{i+1:04d}.txt"),
+                                         raw_processed_text)
+                
+                # Remove <think> tags
+                response_text = self.analyzer._remove_think_tags(response_text)
+                
+                # Extract JSON
+                json_str = self.analyzer._extract_json_array(response_text)
+                
+                if json_str is not None:
+                    attributions = json.loads(json_str)
+                    
+                    result = self._segments_from_attributions(i, segment_text, raw_processed_text, attributions)
+                    if result[2] is None:
+                        self._save_cached_attribution(prompt, raw_processed_text, attributions, i)
+                    return result
+                else:
+                    return [], 0, "Ollama failed"
+            else:
+                return [], 0, f"Ollama request failed (status {response.status_code})"
+                
+        except Exception as e:
+            return [], 0, f"Error ({e})"
+    
+    def _write_artifact(self, path: str, content: str):
+        """Write one artifact file, in the background while a segmentation run is active"""
+        if self._io_pool is not None:
+            self._io_pool.submit(self._atomic_write, path, content)
+        else:
+            self._atomic_write(path, content)
+    
+    @staticmethod
+    def _atomic_write(path: str, content: str):
+        """Write a file via a temp file and rename, so readers never see it half-written"""
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"    Warning: Could not write artifact {path}: {e}")
+    
+    def _attribution_cache_file(self, prompt: str) -> str:
+        """Path of the cached attribution for a prompt sent to the current model"""
+        key = hashlib.blake2b(f"{self.ollama_model}\x00{prompt}".encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def _load_cached_attribution(self, prompt: str) -> Optional[Tuple[str, list]]:
+        """
+        Look up a cached attribution for a prompt
+        
+        Args:
+            prompt (str): Attribution prompt
+            
+        Returns:
+            (raw response, attribution parts) tuple, or None if not cached
+        """
+        if not self.work_dir:
+            return None
+        
+        try:
+            with open(self._attribution_cache_file(prompt), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['response'], data['attributions']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _save_cached_attribution(self, prompt: str, raw_processed_text: str, attributions: list, i: int):
+        """Cache a successful attribution so later runs can skip the request"""
+        if not self.work_dir:
+            return
+        
+        cache_file = self._attribution_cache_file(prompt)
+        # Write to a per-segment temp file first so concurrent workers never see a partial file
+        temp_file = f"{cache_file}.{i}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'response': raw_processed_text, 'attributions': attributions}, f, ensure_ascii=False)
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            print(f"    Warning: Could not cache attribution for segment {i+1}: {e}")
+    
+    def _segments_from_attributions(self, i: int, segment_text: str, raw_processed_text: str,
+                                    attributions: list) -> Tuple[List[CharacterSegment], int, Optional[str]]:
+        """
+        Build character segments from Ollama's attribution parts for one base segment
+        
+        Args:
+            i (int): Base segment index
+            segment_text (str): Base segment text
+            raw_processed_text (str): Raw Ollama response, for the comparison artifact
+            attributions (list): Parsed attribution parts
+            
+        Returns:
+            (segments, parts attributed, error) tuple as for _attribute_segment
+        """
+        char_segments = []
+        type_flags = self._TYPE_FLAGS
+        no_type = (False, False, False)
+        
+        try:
+            for attr in attributions:
+                text_part = attr.get('text', '').strip()
+                if not text_part:
+                    continue
+                
+                char_name = attr.get('character', 'NARRATOR')
+                if char_name == 'NARRATOR':
+                    char_name = None
+                
+                seg_type = attr.get('type', 'narration').lower()
+                emotion_name = attr.get('emotion', 'calm').lower()
+                
+                # Create emotional state
+                emotion_state = self.analyzer.analyze_emotion(text_part)
+                # Override with Ollama's emotion
+                emotion_state.dominant_emotion = emotion_name
+                
+                # Create segment (positional: segment_id, text, character, type flags, emotional_state)
+                is_dialogue, is_thought, is_narration = type_flags.get(seg_type, no_type)
+                char_segments.append(CharacterSegment(
+                    i, text_part, char_name, is_dialogue, is_thought, is_narration, emotion_state
+                ))
+            
+            # Save comparison file
+            if self.save_artifacts:
+                rule = "="*80 + "\n"
+                lines = [
+                    rule, "ORIGINAL TEXT\n", rule, segment_text + "\n\n",
+                    rule, "PROCESSED TEXT (with <think> tags if present)\n", rule, raw_processed_text + "\n\n",
+                    rule, f"CHARACTER ATTRIBUTION ({len(attributions)} parts)\n", rule
+                ]
+                for idx, attr in enumerate(attributions, 1):
+                    lines.append(
+                        f"\nPART {idx}:\n"
+                        f"  Character: {attr.get('character', 'NARRATOR')}\n"
+                        f"  Type: {attr.get('type', 'narration')}\n"
+                        f"  Emotion: {attr.get('emotion', 'calm')}\n"
+                        f"  Text: {attr.get('text', '')}\n"
+                    )
+                
+                comparison_file = os.path.join(self.segmentation_dir, f"segment_{i+1:04d}_comparison.txt")
+                self._write_artifact(comparison_file, ''.join(lines))
+            
+        except Exception as e:
+            return char_segments, 0, f"Error ({e})"
+        
+        return char_segments, len(attributions), None
+    
     def unload_model(self) -> bool:
         """
         Unload the model from VRAM to free up memory.
@@ -329,21 +503,26 @@ IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactl
         Returns:
             bool: True if model was successfully unloaded
         """
+        # Nothing was loaded if Ollama was never used
+        if not self.use_ollama or self._http is None:
+            return True
+        
         try:
             # Send an empty prompt with keep_alive=0 to unload the model
             payload = {
-                "model": self.model,
+                "model": self.ollama_model,
                 "keep_alive": 0
             }
             
-            response = requests.post(
-                self.api_url,
+            # Unloading returns right away; no need for the generation timeout
+            response = self._http.post(
+                f"{self.ollama_url}/api/generate",
                 json=payload,
-                timeout=300
+                timeout=30
             )
             
             if response.status_code == 200:
-                print(f"Unloaded Ollama model '{self.model}' from VRAM")
+                print(f"Unloaded Ollama model '{self.ollama_model}' from VRAM")
                 return True
             else:
                 print(f"Failed to unload Ollama model: {response.status_code}")
@@ -352,20 +531,23 @@ IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactl
         except Exception as e:
             print(f"Error unloading Ollama model: {e}")
             return False
+        finally:
+            # Nothing else is sent until the next segmentation run
+            self.close()
+    
+    def close(self):
+        """Close pooled Ollama connections (the session reconnects if used again)"""
+        if self._http is not None:
+            self._http.close()
     
     def _create_base_segments(self, text: str) -> List[str]:
         """Create base text segments"""
-        sentences = self._split_into_sentences(text)
-        
         segments = []
         current_segment = []
         current_word_count = 0
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-            
+        # Sentences come back stripped and non-empty
+        for sentence in self._split_into_sentences(text):
             sentence_word_count = len(sentence.split())
             
             if current_word_count > 0 and (current_word_count + sentence_word_count) > self.max_words:
@@ -383,17 +565,16 @@ IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactl
     
     def _split_into_sentences(self, text: str) -> List[str]:
         """Split text into sentences"""
-        # Simple sentence splitter
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip()]
+        # Simple sentence splitter; strip each piece once
+        return [s for s in map(str.strip, self._SENTENCE_BOUNDARY_RE.split(text)) if s]
     
     def _split_long_segment(self, segment: CharacterSegment) -> List[CharacterSegment]:
         """Split a long segment into smaller ones"""
-        words = segment.text.split()
-        
-        if len(words) <= self.max_words:
+        if segment.word_count <= self.max_words:
             return [segment]
         
+        words = segment.text.split()
+        
         # Split into chunks
         sub_segments = []
         for i in range(0, len(words), self.max_words):
@@ -410,6 +591,8 @@ IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactl
                 is_narration=segment.is_narration,
                 emotional_state=segment.emotional_state
             )
+            # The chunk's word count is already known; seed the cache instead of re-splitting later
+            sub_seg._word_count, sub_seg._word_count_text = len(chunk_words), chunk_text
             sub_segments.append(sub_seg)
         
         return sub_segments
@@ -427,26 +610,29 @@ IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactl
         if not segments:
             return []
         
-        merged = [segments[0]]
+        merged = []
+        runs = []  # Per merged segment: [texts to join, total word count]
+        last_key = None
         
-        for seg in segments[1:]:
-            last = merged[-1]
-            
-            # Check if we should merge
-            should_merge = (
-                seg.character == last.character and
-                seg.is_dialogue == last.is_dialogue and
-                seg.is_thought == last.is_thought and
-                seg.is_narration == last.is_narration and
-                seg.emotional_state.dominant_emotion == last.emotional_state.dominant_emotion and
-                len(last.text.split()) + len(seg.text.split()) <= self.max_words
-            )
+        for seg in segments:
+            # Segments merge when this whole key matches the previous segment's
+            key = (seg.character, seg.is_dialogue, seg.is_thought, seg.is_narration,
+                   seg.emotional_state.dominant_emotion)
             
-            if should_merge:
-                # Merge texts
-                last.text += ' ' + seg.text
+            if merged and key == last_key and runs[-1][1] + seg.word_count <= self.max_words:
+                runs[-1][0].append(seg.text)
+                runs[-1][1] += seg.word_count
             else:
                 merged.append(seg)
+                runs.append([[seg.text], seg.word_count])
+                last_key = key
+        
+        # Join each run's texts once rather than growing a string per merge;
+        # joining with a space adds the word counts, so carry the cache over
+        for seg, (texts, word_count) in zip(merged, runs):
+            if len(texts) > 1:
+                seg.text = ' '.join(texts)
+                seg._word_count, seg._word_count_text = word_count, seg.text
         
         # Renumber
         for i, seg in enumerate(merged):
@@ -469,23 +655,30 @@ IMPORTANT: Do not duplicate any text. Each piece of text should appear in exactl
                 'characters': []
             }
         
-        word_counts = [len(seg.text.split()) for seg in segments]
-        dialogue_count = sum(1 for seg in segments if seg.is_dialogue)
-        thought_count = sum(1 for seg in segments if seg.is_thought)
-        narration_count = sum(1 for seg in segments if seg.is_narration)
+        # Gather all statistics in a single pass
+        word_counts = []
+        dialogue_count = thought_count = narration_count = 0
+        characters = set()
+        for seg in segments:
+            word_counts.append(seg.word_count)
+            dialogue_count += seg.is_dialogue
+            thought_count += seg.is_thought
+            narration_count += seg.is_narration
+            if seg.character:
+                characters.add(seg.character)
         
-        characters = set(seg.character for seg in segments if seg.character)
+        total_words = sum(word_counts)
         
         return {
             'total_segments': len(segments),
-            'total_words': sum(word_counts),
-            'avg_words_per_segment': sum(word_counts) / len(word_counts),
+            'total_words': total_words,
+            'avg_words_per_segment': total_words / len(word_counts),
             'min_words': min(word_counts),
             'max_words': max(word_counts),
             'dialogue_segments': dialogue_count,
             'thought_segments': thought_count,
             'narration_segments': narration_count,
-            'characters': sorted(list(characters))
+            'characters': sorted(characters)
         }
 
 
@@ -8,7 +8,7 @@ import json
 from pathlib import Path
 
 
-@dataclass
+@dataclass(slots=True)
 class VoiceConfig:
     """Voice configuration for a character"""
     speaker_audio: str  # Path to speaker reference audio
@@ -24,7 +24,7 @@ class VoiceConfig:
         return cls(**data)
 
 
-@dataclass
+@dataclass(slots=True)
 class CharacterVoiceMapping:
     """Complete character to voice mapping configuration"""
     narrator_voice: VoiceConfig
@@ -61,16 +61,20 @@ class CharacterVoiceMapping:
         if is_narration or character_name is None:
             return self.narrator_voice
         
-        if character_name in self.character_voices:
-            return self.character_voices[character_name]
+        # Single lookup on the live dict, so later edits to the mapping are always seen
+        voice = self.character_voices.get(character_name)
+        if voice is not None:
+            return voice
         
-        # Return default or narrator voice as fallback
+        # Unknown characters get the default or narrator voice as fallback
         return self.default_voice if self.default_voice else self.narrator_voice
     
     def save(self, filepath: str):
         """Save configuration to JSON file"""
+        # Encode fully first so the file is written in one call
+        content = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            f.write(content)
         print(f"Voice configuration saved to: {filepath}")
     
     @classmethod
@@ -124,7 +128,7 @@ class CharacterVoiceMapping:
         return mapping
 
 
-@dataclass
+@dataclass(slots=True)
 class EmotionReference:
     """Emotion reference audio configuration"""
     emotion_name: str
@@ -139,7 +143,7 @@ class EmotionReference:
         return cls(**data)
 
 
-@dataclass
+@dataclass(slots=True)
 class EmotionLibrary:
     """Library of emotion reference audio files"""
     emotions: Dict[str, EmotionReference]
@@ -162,8 +166,10 @@ class EmotionLibrary:
     
     def save(self, filepath: str):
         """Save emotion library to JSON file"""
+        # Encode fully first so the file is written in one call
+        content = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            f.write(content)
         print(f"Emotion library saved to: {filepath}")
     
     @classmethod
@@ -4,12 +4,17 @@ Executes jobs with step tracking and resume support
 """
 import json
 import logging
+import os
+import queue
+import shutil
+import threading
+import time
 from pathlib import Path
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, List
 from datetime import datetime
 
 from job_state import JobState, JobStepState, StepStatus, StepExecutionContext
-from step_registry import step_registry
+from step_registry import step_registry, StepDefinition
 
 logger = logging.getLogger(__name__)
 
@@ -24,38 +29,69 @@ class JobExecutor:
         self.running_jobs_path = self.jobs_base_path / "running"
         self.pending_jobs_path = self.jobs_base_path / "pending"
         
+        # Directories this executor has already created (see _ensure_dir)
+        self._dirs_created: set = set()
+        
         # Ensure directories exist
         for path in [self.failed_jobs_path, self.completed_jobs_path, 
                      self.running_jobs_path, self.pending_jobs_path]:
-            path.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(path)
+        
+        # Background state writer, active while execute_job runs. The queue holds at
+        # most one pending snapshot; a newer save replaces one that hasn't been written yet.
+        self._save_queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=1)
+        self._save_thread: Optional[threading.Thread] = None
+        
+        # (job directory, state file) for each (status, job_id) seen by save_job_state
+        self._state_paths: Dict[tuple, tuple] = {}
+        
+        # Job states saved by this executor, so load_job_state can skip re-reading them
+        self._live_states: Dict[str, JobState] = {}
     
-    def create_job_state(self, job_id: str) -> JobState:
-        """Create a new job state with steps from registry"""
-        ordered_steps = step_registry.get_ordered_steps()
+    def _ensure_dir(self, path: Path) -> None:
+        """Create a directory unless this executor already did"""
+        if path in self._dirs_created:
+            return
+        path.mkdir(parents=True, exist_ok=True)
+        self._dirs_created.add(path)
+    
+    def _forget_dirs(self, path: Path) -> None:
+        """Drop a moved or removed directory (and everything under it) from the created set"""
+        self._dirs_created = {p for p in self._dirs_created if p != path and path not in p.parents}
+    
+    def create_job_state(self, job_id: str, ordered_steps: Optional[List[StepDefinition]] = None) -> JobState:
+        """Create a new job state with steps from registry (or the given ordered step list)"""
+        if ordered_steps is None:
+            ordered_steps = step_registry.get_ordered_steps()
         
         steps = [
-            JobStepState(
-                step_id=step_def.step_id,
-                step_name=step_def.step_name,
-                status=StepStatus.PENDING
-            )
+            JobStepState(step_def.step_id, step_def.step_name, StepStatus.PENDING)
             for step_def in ordered_steps
         ]
         
+        now = datetime.utcnow().isoformat()
         job_state = JobState(
             job_id=job_id,
             status="pending",
             steps=steps,
             total_steps=len(steps),
-            created_at=datetime.utcnow().isoformat(),
-            updated_at=datetime.utcnow().isoformat()
+            created_at=now,
+            updated_at=now
         )
         
         logger.info(f"Created job state for {job_id} with {len(steps)} steps")
         return job_state
     
     def load_job_state(self, job_id: str, from_failed: bool = False) -> Optional[JobState]:
-        """Load job state from disk"""
+        """Load job state from disk (or the live state this executor last saved there)"""
+        # A state this executor saved is still current as long as its file is where we wrote it
+        cached = self._live_states.get(job_id)
+        if cached is not None and cached.status == ("failed" if from_failed else "running"):
+            paths = self._state_paths.get((cached.status, job_id))
+            if paths is not None and os.path.exists(paths[1]):
+                logger.info(f"Using in-memory job state for {job_id}")
+                return cached
+        
         if from_failed:
             job_path = self.failed_jobs_path / job_id
         else:
@@ -84,26 +120,99 @@ class JobExecutor:
     
     def save_job_state(self, job_state: JobState) -> None:
         """Save job state to disk"""
-        # Determine current location based on status
-        if job_state.status == "running":
-            job_path = self.running_jobs_path / job_state.job_id
-        elif job_state.status == "failed":
-            job_path = self.failed_jobs_path / job_state.job_id
-        elif job_state.status == "completed":
-            job_path = self.completed_jobs_path / job_state.job_id
+        key = (job_state.status, job_state.job_id)
+        paths = self._state_paths.get(key)
+        if paths is None:
+            # Determine current location based on status
+            if job_state.status == "running":
+                job_path = self.running_jobs_path / job_state.job_id
+            elif job_state.status == "failed":
+                job_path = self.failed_jobs_path / job_state.job_id
+            elif job_state.status == "completed":
+                job_path = self.completed_jobs_path / job_state.job_id
+            else:
+                job_path = self.pending_jobs_path / job_state.job_id
+            paths = self._state_paths[key] = (job_path, str(job_path / "job_state.json"))
+        
+        if job_state.status == "completed":
+            self._live_states.pop(job_state.job_id, None)
         else:
-            job_path = self.pending_jobs_path / job_state.job_id
+            self._live_states[job_state.job_id] = job_state
         
-        job_path.mkdir(parents=True, exist_ok=True)
-        state_file = job_path / "job_state.json"
-        job_state.save(str(state_file))
-        logger.debug(f"Saved job state for {job_state.job_id}")
+        if self._save_thread is None:
+            self._write_job_state(*paths, job_state.to_dict())
+            return
+        
+        # Snapshot now (to_dict copies the step data), write on the background thread
+        item = (*paths, job_state.to_dict())
+        while True:
+            try:
+                self._save_queue.put_nowait(item)
+                return
+            except queue.Full:
+                # Drop the older snapshot that is still waiting to be written
+                try:
+                    self._save_queue.get_nowait()
+                    self._save_queue.task_done()
+                except queue.Empty:
+                    pass
     
-    def load_job_definition(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Load job definition from disk"""
+    def _write_job_state(self, job_path: Path, state_file: str, data: Dict[str, Any]) -> None:
+        """Write a job state snapshot to state_file inside job_path"""
+        self._ensure_dir(job_path)
+        try:
+            JobState.save_dict(data, state_file)
+        except FileNotFoundError:
+            # The job directory was moved by someone else since we created it
+            self._forget_dirs(job_path)
+            self._ensure_dir(job_path)
+            JobState.save_dict(data, state_file)
+        logger.debug("Saved job state for %s", data['job_id'])
+    
+    def _save_worker(self) -> None:
+        """Write queued job state snapshots until a None sentinel arrives"""
+        while True:
+            item = self._save_queue.get()
+            try:
+                if item is None:
+                    return
+                try:
+                    self._write_job_state(*item)
+                except Exception as e:
+                    logger.error(f"Failed to save job state: {e}")
+            finally:
+                self._save_queue.task_done()
+    
+    def _start_state_writer(self) -> None:
+        """Start the background state writer"""
+        if self._save_thread is None:
+            self._save_thread = threading.Thread(target=self._save_worker, name="job-state-writer", daemon=True)
+            self._save_thread.start()
+    
+    def _stop_state_writer(self) -> None:
+        """Write any pending state and stop the background writer"""
+        if self._save_thread is not None:
+            self._save_queue.put(None)
+            self._save_thread.join()
+            self._save_thread = None
+    
+    def load_job_definition(self, job_id: str, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Load job definition from disk
+        
+        Args:
+            job_id: Job identifier
+            status: Directory the job is expected in ("pending", "running", "failed"
+                or "completed"); checked first, before the other locations
+        """
+        base_paths = [self.pending_jobs_path, self.running_jobs_path, 
+                      self.failed_jobs_path, self.completed_jobs_path]
+        if status is not None:
+            expected = self.jobs_base_path / status
+            base_paths = [expected] + [path for path in base_paths if path != expected]
+        
         # Try all possible locations
-        for base_path in [self.pending_jobs_path, self.running_jobs_path, 
-                          self.failed_jobs_path, self.completed_jobs_path]:
+        for base_path in base_paths:
             job_path = base_path / job_id
             def_file = job_path / "job_definition.json"
             if def_file.exists():
@@ -132,7 +241,12 @@ class JobExecutor:
         Returns:
             True if job completed successfully, False otherwise
         """
+        self._start_state_writer()
         try:
+            # Resolve the registered steps once for this run
+            ordered_steps = step_registry.get_ordered_steps()
+            step_defs = {step_def.step_id: step_def for step_def in ordered_steps}
+            
             if resume:
                 logger.info(f"Resuming job {job_id}")
                 job_state = self.load_job_state(job_id, from_failed=True)
@@ -142,7 +256,7 @@ class JobExecutor:
                 
                 # Load job definition if not provided
                 if job_data is None:
-                    job_data = self.load_job_definition(job_id)
+                    job_data = self.load_job_definition(job_id, status="failed")
                     if not job_data:
                         logger.error(f"Cannot resume job {job_id}: definition not found")
                         return False
@@ -151,10 +265,10 @@ class JobExecutor:
                 self._move_job(job_id, self.failed_jobs_path, self.running_jobs_path)
             else:
                 logger.info(f"Starting new job {job_id}")
-                job_state = self.create_job_state(job_id)
+                job_state = self.create_job_state(job_id, ordered_steps)
                 
                 if job_data is None:
-                    job_data = self.load_job_definition(job_id)
+                    job_data = self.load_job_definition(job_id, status="pending")
                     if not job_data:
                         logger.error(f"Cannot start job {job_id}: definition not found")
                         return False
@@ -164,7 +278,7 @@ class JobExecutor:
             # Create work directory
             job_path = self.running_jobs_path / job_id
             work_dir = job_path / "work"
-            work_dir.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(work_dir)
             
             # Create execution context
             context = StepExecutionContext(
@@ -174,45 +288,7 @@ class JobExecutor:
             )
             
             # Execute steps
-            while True:
-                next_step = job_state.get_next_step()
-                if not next_step:
-                    break
-                
-                step_def = step_registry.get_step(next_step.step_id)
-                if not step_def:
-                    logger.error(f"Step definition not found: {next_step.step_id}")
-                    job_state.mark_step_failed(next_step.step_id, "Step definition not found")
-                    break
-                
-                # Check dependencies
-                if not self._check_dependencies(step_def, job_state):
-                    error_msg = f"Dependencies not satisfied for step {step_def.step_id}"
-                    logger.error(error_msg)
-                    job_state.mark_step_failed(next_step.step_id, error_msg)
-                    break
-                
-                # Execute step with retry logic
-                success = self._execute_step_with_retry(
-                    step_def,
-                    next_step,
-                    context,
-                    job_state
-                )
-                
-                # Save state after each step
-                self.save_job_state(job_state)
-                
-                # Call progress callback
-                if progress_callback:
-                    try:
-                        progress_callback(job_state)
-                    except Exception as e:
-                        logger.warning(f"Progress callback error: {e}")
-                
-                if not success and step_def.required:
-                    logger.error(f"Required step failed: {step_def.step_id}")
-                    break
+            self._run_steps(job_state, step_defs, context, progress_callback)
             
             # Determine final status
             if all(s.status == StepStatus.COMPLETED for s in job_state.steps):
@@ -232,6 +308,57 @@ class JobExecutor:
         except Exception as e:
             logger.exception(f"Error executing job {job_id}: {e}")
             return False
+        
+        finally:
+            self._stop_state_writer()
+    
+    def _run_steps(
+        self,
+        job_state: JobState,
+        step_defs: Dict[str, StepDefinition],
+        context: StepExecutionContext,
+        progress_callback: Optional[Callable]
+    ) -> None:
+        """Run pending steps in order until all are done or a required step fails"""
+        while True:
+            next_step = job_state.get_next_step()
+            if not next_step:
+                break
+            
+            step_def = step_defs.get(next_step.step_id)
+            if not step_def:
+                logger.error(f"Step definition not found: {next_step.step_id}")
+                job_state.mark_step_failed(next_step.step_id, "Step definition not found")
+                break
+            
+            # Check dependencies
+            if not self._check_dependencies(step_def, job_state):
+                error_msg = f"Dependencies not satisfied for step {step_def.step_id}"
+                logger.error(error_msg)
+                job_state.mark_step_failed(next_step.step_id, error_msg)
+                break
+            
+            # Execute step with retry logic
+            success = self._execute_step_with_retry(
+                step_def,
+                next_step,
+                context,
+                job_state
+            )
+            
+            # Save state after each step
+            self.save_job_state(job_state)
+            
+            # Call progress callback
+            if progress_callback:
+                try:
+                    progress_callback(job_state)
+                except Exception as e:
+                    logger.warning(f"Progress callback error: {e}")
+            
+            if not success and step_def.required:
+                logger.error(f"Required step failed: {step_def.step_id}")
+                break
     
     def _execute_step_with_retry(
         self,
@@ -245,7 +372,7 @@ class JobExecutor:
         
         for attempt in range(max_retries):
             try:
-                logger.info(f"Executing step {step_def.step_id} (attempt {attempt + 1}/{max_retries})")
+                logger.info("Executing step %s (attempt %d/%d)", step_def.step_id, attempt + 1, max_retries)
                 job_state.mark_step_started(step_state.step_id)
                 
                 # Execute the step handler
@@ -260,14 +387,14 @@ class JobExecutor:
                     metadata={"result": result, "attempts": attempt + 1}
                 )
                 
-                logger.info(f"Step {step_def.step_id} completed successfully")
+                logger.info("Step %s completed successfully", step_def.step_id)
                 return True
             
             except Exception as e:
                 logger.error(f"Step {step_def.step_id} failed (attempt {attempt + 1}): {e}")
                 
                 if attempt < max_retries - 1:
-                    logger.info(f"Retrying step {step_def.step_id}")
+                    logger.info("Retrying step %s", step_def.step_id)
                     continue
                 else:
                     job_state.mark_step_failed(step_state.step_id, str(e))
@@ -285,14 +412,35 @@ class JobExecutor:
     
     def _move_job(self, job_id: str, from_path: Path, to_path: Path) -> None:
         """Move job between directories"""
+        # Pending state writes target the current directory, so finish them first
+        self._save_queue.join()
+        
         source = from_path / job_id
         dest = to_path / job_id
         
         if source.exists():
-            dest.parent.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(dest.parent)
             if dest.exists():
                 # Remove destination if it exists
-                import shutil
-                shutil.rmtree(dest)
+                self._discard_dir(dest)
             source.rename(dest)
+            self._forget_dirs(source)
+            self._forget_dirs(dest)
             logger.debug(f"Moved job {job_id} from {from_path.name} to {to_path.name}")
+    
+    def _discard_dir(self, path: Path) -> None:
+        """Remove a directory tree, deleting its files on a background thread"""
+        # Rename out of the way first (one syscall), so the caller can reuse the path
+        # right away; the trash lives outside the status directories that get listed
+        trash_path = self.jobs_base_path / ".trash"
+        trash = trash_path / f"{path.name}.{time.time_ns()}"
+        try:
+            trash_path.mkdir(exist_ok=True)
+            path.rename(trash)
+        except OSError:
+            shutil.rmtree(path)
+            return
+        
+        # Clear the whole trash so leftovers from interrupted runs go too
+        threading.Thread(target=shutil.rmtree, args=(trash_path,), kwargs={'ignore_errors': True},
+                         name="job-trash-cleaner", daemon=True).start()
@@ -3,6 +3,7 @@ Job Queue Processor for batch audiobook generation
 Processes jobs from the jobs/ directory with individual configurations
 """
 import os
+import errno
 import json
 import uuid
 import time
@@ -11,8 +12,9 @@ import subprocess
 import sys
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 
@@ -22,6 +24,19 @@ from job_state import JobState, StepStatus
 logger = logging.getLogger(__name__)
 
 
+def _read_json(path) -> Any:
+    """Read and parse a JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path, data: Any) -> None:
+    """Write data as indented JSON, encoded up front so the file is written in one call"""
+    content = json.dumps(data, indent=2)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
 class JobStatus(Enum):
     """Job processing status"""
     PENDING = "pending"
@@ -31,7 +46,26 @@ class JobStatus(Enum):
     CANCELLED = "cancelled"
 
 
-@dataclass
+DEFAULT_OLLAMA_URL = "http://host.docker.internal:11434"
+
+# Optional CLI arguments in the order to_command_args emits them: (attribute, flag, kind), where
+# "switch" adds the bare flag when truthy, "value" adds flag + value when truthy, and
+# "non_default" adds flag + value when it differs from the default
+_COMMAND_FLAGS = (
+    ("detect_characters", "--detect-characters", "switch"),
+    ("ollama_character_detection", "--ollama-character-detection", "switch"),
+    ("character_mode", "--character-mode", "switch"),
+    ("keep_segments", "--keep-segments", "switch"),
+    ("use_ollama", "--use-ollama", "switch"),
+    ("ollama_model", "--ollama-model", "value"),
+    ("ollama_url", "--ollama-url", "non_default"),
+    ("character_config", "--character-config", "value"),
+    ("emotion_library", "--emotion-library", "value"),
+    ("emo_audio_prompt", "--emo-audio", "value"),
+)
+
+
+@dataclass(slots=True)
 class JobDefinition:
     """Job configuration definition"""
     job_id: str
@@ -47,7 +81,7 @@ class JobDefinition:
     keep_segments: bool = False
     use_ollama: bool = False
     ollama_model: Optional[str] = None
-    ollama_url: str = "http://host.docker.internal:11434"
+    ollama_url: str = DEFAULT_OLLAMA_URL
     segment_words: int = 500
     strip_unknown_tokens: bool = True  # Strip problematic tokens for TTS
     character_config: Optional[str] = None
@@ -60,7 +94,8 @@ class JobDefinition:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
-        return asdict(self)
+        # Every field is a primitive, so a shallow copy matches asdict() without its deep walk
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'JobDefinition':
@@ -92,35 +127,16 @@ class JobDefinition:
         if work_dir:
             args.extend(["--work-dir", work_dir])
         
-        if self.detect_characters:
-            args.append("--detect-characters")
-        
-        if self.ollama_character_detection:
-            args.append("--ollama-character-detection")
-        
-        if self.character_mode:
-            args.append("--character-mode")
-        
-        if self.keep_segments:
-            args.append("--keep-segments")
-        
-        if self.use_ollama:
-            args.append("--use-ollama")
-        
-        if self.ollama_model:
-            args.extend(["--ollama-model", self.ollama_model])
-        
-        if self.ollama_url != "http://host.docker.internal:11434":
-            args.extend(["--ollama-url", self.ollama_url])
-        
-        if self.character_config:
-            args.extend(["--character-config", self.character_config])
-        
-        if self.emotion_library:
-            args.extend(["--emotion-library", self.emotion_library])
-        
-        if self.emo_audio_prompt:
-            args.extend(["--emo-audio", self.emo_audio_prompt])
+        for attr, flag, kind in _COMMAND_FLAGS:
+            value = getattr(self, attr)
+            if kind == "switch":
+                if value:
+                    args.append(flag)
+            elif kind == "value":
+                if value:
+                    args.extend([flag, value])
+            elif value != DEFAULT_OLLAMA_URL:
+                args.extend([flag, value])
         
         # Add segment words parameter
         args.extend(["--segment-words", str(self.segment_words)])
@@ -134,7 +150,7 @@ class JobDefinition:
         return args
 
 
-@dataclass
+@dataclass(slots=True)
 class JobResult:
     """Job execution result"""
     job_id: str
@@ -147,7 +163,7 @@ class JobResult:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
-        data = asdict(self)
+        data = {name: getattr(self, name) for name in self.__dataclass_fields__}
         data['status'] = self.status.value
         return data
     
@@ -161,16 +177,20 @@ class JobResult:
 class JobQueue:
     """Manages job queue and processing"""
     
-    def __init__(self, jobs_dir: str = "./jobs", max_retries: int = 3):
+    def __init__(self, jobs_dir: str = "./jobs", max_retries: int = 3, max_workers: int = 1):
         """
         Initialize job queue
         
         Args:
             jobs_dir (str): Directory containing job folders
             max_retries (int): Maximum number of retry attempts for failed jobs
+            max_workers (int): Number of jobs process_queue runs at the same time. Steps run
+                in-process and each running job loads its own TTS model, so GPU memory
+                scales with this; keep it at 1 unless the GPU fits one model per worker
         """
         self.jobs_dir = Path(jobs_dir)
         self.max_retries = max_retries
+        self.max_workers = max(1, max_workers)
         
         # Create jobs directory structure
         self.jobs_dir.mkdir(exist_ok=True)
@@ -178,6 +198,17 @@ class JobQueue:
         (self.jobs_dir / "running").mkdir(exist_ok=True)
         (self.jobs_dir / "completed").mkdir(exist_ok=True)
         (self.jobs_dir / "failed").mkdir(exist_ok=True)
+        
+        # Parsed pending job definitions: job_id -> (job_definition.json mtime_ns, JobDefinition)
+        self._pending_cache: Dict[str, Tuple[int, JobDefinition]] = {}
+        
+        # Last known status directory of each job moved or looked up through this queue.
+        # Only a hint: other processes move jobs too, so lookups fall back to probing.
+        self._status_index: Dict[str, str] = {}
+        
+        # Shared executor for reading job states. Running a job keeps its own executor,
+        # since execute_job holds per-run state (background state writer, live state cache).
+        self._executor = JobExecutor(self.jobs_dir)
     
     def create_job(self, job_def: JobDefinition) -> str:
         """
@@ -213,27 +244,38 @@ class JobQueue:
         
         for attr_name, default_filename in config_files_to_copy:
             source_path = getattr(job_def, attr_name, None)
-            if source_path and os.path.exists(source_path):
+            if source_path:
+                # Copy straight away; a missing file is skipped (no separate exists() check)
                 dest_path = job_work_dir / os.path.basename(source_path)
-                shutil.copy2(source_path, dest_path)
+                try:
+                    shutil.copy2(source_path, dest_path)
+                except FileNotFoundError:
+                    continue
                 print(f"  Copied {os.path.basename(source_path)} to job work directory")
         
         # Copy detected_characters.json if it exists in the default work directory
         default_work_dir = Path("./work")
         detected_chars_file = default_work_dir / "detected_characters.json"
-        if detected_chars_file.exists():
-            dest_chars_file = job_work_dir / "detected_characters.json"
+        dest_chars_file = job_work_dir / "detected_characters.json"
+        try:
             shutil.copy2(detected_chars_file, dest_chars_file)
             print(f"  Copied detected_characters.json to job work directory")
+        except FileNotFoundError:
+            pass
         
         # Save job definition
         job_file = job_dir / "job_definition.json"
-        with open(job_file, 'w', encoding='utf-8') as f:
-            json.dump(job_def.to_dict(), f, indent=2)
+        _write_json(job_file, job_def.to_dict())
         
+        self._status_index[job_def.job_id] = "pending"
         print(f"Created job {job_def.job_id}")
         return job_def.job_id
     
+    @staticmethod
+    def _queue_order(job: JobDefinition) -> Tuple[int, str]:
+        """Sort key for pending jobs: priority (highest first), then creation time"""
+        return (-job.priority, job.created_at or "")
+    
     def get_pending_jobs(self) -> List[JobDefinition]:
         """
         Get all pending jobs sorted by priority (highest first)
@@ -241,22 +283,55 @@ class JobQueue:
         Returns:
             List of job definitions
         """
+        jobs = self._scan_pending_jobs()
+        
+        # Sort by priority (highest first), then by creation time
+        jobs.sort(key=self._queue_order)
+        return jobs
+    
+    def get_next_pending_job(self, exclude: Iterable[str] = ()) -> Optional[JobDefinition]:
+        """
+        Get the pending job that would be processed next, without sorting the whole queue
+        
+        Args:
+            exclude: Job IDs to skip (e.g. jobs already handed to a worker)
+            
+        Returns:
+            The first job in get_pending_jobs() order, or None if the queue is empty
+        """
+        exclude = set(exclude)
+        jobs = (job for job in self._scan_pending_jobs() if job.job_id not in exclude)
+        return min(jobs, key=self._queue_order, default=None)
+    
+    def _scan_pending_jobs(self) -> List[JobDefinition]:
+        """Read the definitions of all pending jobs, in directory order"""
         pending_dir = self.jobs_dir / "pending"
         jobs = []
         
         if not pending_dir.exists():
             return jobs
         
-        for job_dir in pending_dir.iterdir():
-            if job_dir.is_dir():
-                job_file = job_dir / "job_definition.json"
-                if job_file.exists():
-                    with open(job_file, 'r', encoding='utf-8') as f:
-                        job_data = json.load(f)
-                        jobs.append(JobDefinition.from_dict(job_data))
-        
-        # Sort by priority (highest first), then by creation time
-        jobs.sort(key=lambda x: (-x.priority, x.created_at or ""))
+        # Only re-parse definitions whose file changed since the last scan
+        cache = {}
+        with os.scandir(pending_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    job_file = os.path.join(entry.path, "job_definition.json")
+                    try:
+                        mtime_ns = os.stat(job_file).st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+                    
+                    cached = self._pending_cache.get(entry.name)
+                    if cached is not None and cached[0] == mtime_ns:
+                        job_def = cached[1]
+                    else:
+                        job_def = JobDefinition.from_dict(_read_json(job_file))
+                    cache[entry.name] = (mtime_ns, job_def)
+                    jobs.append(job_def)
+        
+        # Drop jobs that have left the pending directory
+        self._pending_cache = cache
         return jobs
     
     def move_job(self, job_id: str, from_status: str, to_status: str) -> None:
@@ -273,7 +348,18 @@ class JobQueue:
         
         if src_dir.exists():
             dst_dir.parent.mkdir(parents=True, exist_ok=True)
-            shutil.move(str(src_dir), str(dst_dir))
+            if dst_dir.exists():
+                # Keep shutil.move semantics (moves the job inside the existing directory)
+                shutil.move(str(src_dir), str(dst_dir))
+            else:
+                try:
+                    # Same volume: a single atomic rename
+                    os.replace(src_dir, dst_dir)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(str(src_dir), str(dst_dir))
+            self._status_index[job_id] = to_status
     
     def process_job(self, job_def: JobDefinition, resume: bool = False) -> JobResult:
         """
@@ -291,14 +377,18 @@ class JobQueue:
         job_id = job_def.job_id
         start_time = datetime.now().isoformat()
         
-        print(f"\n{'='*60}")
-        print(f"{'Resuming' if resume else 'Processing'} Job: {job_id}")
-        print(f"{'='*60}")
-        print(f"Source: {job_def.source_text_file}")
-        print(f"Voice: {job_def.voice_ref_path}")
-        print(f"Output: {job_def.output_path}")
-        print(f"Priority: {job_def.priority}")
-        print(f"{'='*60}\n")
+        # One print per banner so concurrent workers don't interleave lines
+        rule = '=' * 60
+        print(
+            f"\n{rule}\n"
+            f"{'Resuming' if resume else 'Processing'} Job: {job_id}\n"
+            f"{rule}\n"
+            f"Source: {job_def.source_text_file}\n"
+            f"Voice: {job_def.voice_ref_path}\n"
+            f"Output: {job_def.output_path}\n"
+            f"Priority: {job_def.priority}\n"
+            f"{rule}\n"
+        )
         
         # Move job to running (if not already there from failed state)
         if not resume:
@@ -354,9 +444,9 @@ class JobQueue:
         )
         
         # Save result
+        self._status_index[job_id] = status.value
         result_file = self.jobs_dir / status.value / job_id / "result.json"
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump(job_result.to_dict(), f, indent=2)
+        _write_json(result_file, job_result.to_dict())
         
         return job_result
     
@@ -373,42 +463,56 @@ class JobQueue:
         """
         results = []
         processed = 0
-        
-        while True:
-            # Get pending jobs
-            pending_jobs = self.get_pending_jobs()
-            
-            if not pending_jobs:
-                print("\nNo more pending jobs in queue")
-                break
-            
-            if max_jobs and processed >= max_jobs:
-                print(f"\nReached maximum job limit ({max_jobs})")
-                break
-            
-            # Process next job
-            job = pending_jobs[0]
-            result = self.process_job(job)
-            results.append(result)
-            processed += 1
-            
-            # Check if we should stop on error
-            if stop_on_error and result.status == JobStatus.FAILED:
-                print("\nStopping due to job failure (stop_on_error=True)")
-                break
+        stopping = False
+        in_flight: Dict[Future, str] = {}  # Running job futures -> job ID
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                # Start the highest priority pending jobs until every worker is busy
+                while not stopping and len(in_flight) < self.max_workers:
+                    job = self.get_next_pending_job(exclude=in_flight.values())
+                    if job is None:
+                        break
+                    
+                    if max_jobs and processed >= max_jobs:
+                        print(f"\nReached maximum job limit ({max_jobs})")
+                        stopping = True
+                        break
+                    
+                    in_flight[pool.submit(self.process_job, job)] = job.job_id
+                    processed += 1
+                
+                if not in_flight:
+                    if not stopping:
+                        print("\nNo more pending jobs in queue")
+                    break
+                
+                # Wait for a job to finish, then refill its slot
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+                    result = future.result()
+                    results.append(result)
+                    
+                    # Check if we should stop on error (running jobs are left to finish)
+                    if stop_on_error and result.status == JobStatus.FAILED and not stopping:
+                        print("\nStopping due to job failure (stop_on_error=True)")
+                        stopping = True
         
         # Print summary
-        print(f"\n{'='*60}")
-        print("Job Queue Processing Summary")
-        print(f"{'='*60}")
-        print(f"Total jobs processed: {len(results)}")
-        
         completed = sum(1 for r in results if r.status == JobStatus.COMPLETED)
         failed = sum(1 for r in results if r.status == JobStatus.FAILED)
         
-        print(f"Completed: {completed}")
-        print(f"Failed: {failed}")
-        print(f"{'='*60}\n")
+        rule = '=' * 60
+        print(
+            f"\n{rule}\n"
+            "Job Queue Processing Summary\n"
+            f"{rule}\n"
+            f"Total jobs processed: {len(results)}\n"
+            f"Completed: {completed}\n"
+            f"Failed: {failed}\n"
+            f"{rule}\n"
+        )
         
         return results
     
@@ -422,12 +526,18 @@ class JobQueue:
         Returns:
             JobResult if found, None otherwise
         """
-        # Check all status directories
-        for status in ["pending", "running", "completed", "failed"]:
+        # Check the last known status directory first, then all of them
+        statuses = ["pending", "running", "completed", "failed"]
+        known = self._status_index.get(job_id)
+        if known in statuses:
+            statuses.remove(known)
+            statuses.insert(0, known)
+        
+        for status in statuses:
             result_file = self.jobs_dir / status / job_id / "result.json"
             if result_file.exists():
-                with open(result_file, 'r', encoding='utf-8') as f:
-                    return JobResult.from_dict(json.load(f))
+                self._status_index[job_id] = status
+                return JobResult.from_dict(_read_json(result_file))
         
         # Check if pending (no result yet)
         job_file = self.jobs_dir / "pending" / job_id / "job_definition.json"
@@ -457,9 +567,9 @@ class JobQueue:
         for stat in statuses:
             status_dir = self.jobs_dir / stat
             if status_dir.exists():
-                for job_dir in status_dir.iterdir():
-                    if job_dir.is_dir():
-                        job_ids.append(job_dir.name)
+                # scandir reports the entry type from the listing itself, no stat per job
+                with os.scandir(status_dir) as entries:
+                    job_ids.extend(entry.name for entry in entries if entry.is_dir())
         
         return job_ids
     
@@ -480,6 +590,7 @@ class JobQueue:
             cancelled_dir.mkdir(exist_ok=True)
             
             shutil.move(str(pending_dir), str(cancelled_dir / job_id))
+            self._status_index[job_id] = "cancelled"
             print(f"Cancelled job {job_id}")
             return True
         
@@ -496,11 +607,11 @@ class JobQueue:
         Returns:
             JobState if found, None otherwise
         """
-        executor = JobExecutor(self.jobs_dir)
-        
-        # Try loading from any status folder
-        for status in ["pending", "running", "completed", "failed"]:
-            job_state = executor.load_job_state(job_id, from_failed=(status == "failed"))
+        # load_job_state checks running/ then pending/, or failed/ then pending/ with
+        # from_failed, so two calls cover every folder it reads; start with the known status
+        failed_first = self._status_index.get(job_id) == "failed"
+        for from_failed in (failed_first, not failed_first):
+            job_state = self._executor.load_job_state(job_id, from_failed=from_failed)
             if job_state:
                 return job_state
         
@@ -539,20 +650,17 @@ class JobQueue:
             logger.error(f"Job definition missing for failed job {job_id}")
             return None
         
-        with open(job_file, 'r', encoding='utf-8') as f:
-            job_data = json.load(f)
-            job_def = JobDefinition.from_dict(job_data)
+        job_def = JobDefinition.from_dict(_read_json(job_file))
         
         print(f"\n{'='*60}")
         print(f"Resuming Failed Job: {job_id}")
         print(f"{'='*60}")
         
         # Get current job state to show progress
-        executor = JobExecutor(self.jobs_dir)
-        job_state = executor.load_job_state(job_id, from_failed=True)
+        job_state = self._executor.load_job_state(job_id, from_failed=True)
         
         if job_state:
-            completed_steps = len(job_state.get_completed_steps())
+            completed_steps = job_state.get_completed_count()
             total_steps = job_state.total_steps
             progress = job_state.get_progress_percentage()
             
@@ -593,9 +701,7 @@ class JobQueue:
             print(f"Job {job_id} not found in pending queue")
             return None
         
-        with open(job_file, 'r', encoding='utf-8') as f:
-            job_data = json.load(f)
-            job_def = JobDefinition.from_dict(job_data)
+        job_def = JobDefinition.from_dict(_read_json(job_file))
         
         # Process the job
         return self.process_job(job_def)
@@ -609,6 +715,10 @@ def main():
     parser.add_argument("--jobs-dir", default="./jobs", help="Jobs directory (default: ./jobs)")
     parser.add_argument("--max-jobs", type=int, help="Maximum number of jobs to process")
     parser.add_argument("--stop-on-error", action="store_true", help="Stop processing on first error")
+    parser.add_argument("--max-workers", type=int, default=1,
+                       help="Number of jobs to process at the same time (default: 1). "
+                            "Each running job loads its own TTS model in this process, "
+                            "so GPU memory use grows with every extra worker")
     parser.add_argument("--list", choices=["pending", "running", "completed", "failed", "all"], 
                        help="List jobs by status")
     parser.add_argument("--status", help="Get status of specific job ID")
@@ -618,7 +728,7 @@ def main():
     
     args = parser.parse_args()
     
-    queue = JobQueue(jobs_dir=args.jobs_dir)
+    queue = JobQueue(jobs_dir=args.jobs_dir, max_workers=args.max_workers)
     
     # Handle list command
     if args.list:
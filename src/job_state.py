@@ -5,8 +5,9 @@ Tracks the state of jobs and their individual steps for resumable execution
 from enum import Enum
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 import json
+import os
 
 
 class StepStatus(str, Enum):
@@ -18,6 +19,33 @@ class StepStatus(str, Enum):
     SKIPPED = "skipped"
 
 
+# Value -> member table for from_dict; a plain dict lookup skips the Enum call machinery
+_STATUS_LOOKUP: Dict[str, StepStatus] = {status.value: status for status in StepStatus}
+
+
+def _to_plain(value: Any) -> Any:
+    """
+    Copy step metadata into plain JSON-ready data
+    
+    Containers are copied so the snapshot doesn't share them with live step results,
+    and result objects such as CharacterSegment are converted with their own to_dict().
+    
+    Args:
+        value: Metadata value to convert
+        
+    Returns:
+        Converted value
+    """
+    if isinstance(value, dict):
+        return {key: _to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    return value
+
+
 @dataclass
 class JobStepState:
     """State of an individual job step"""
@@ -32,14 +60,23 @@ class JobStepState:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
-        data = asdict(self)
-        data['status'] = self.status.value
-        return data
+        return {
+            'step_id': self.step_id,
+            'step_name': self.step_name,
+            'status': self.status.value,
+            'started_at': self.started_at,
+            'completed_at': self.completed_at,
+            'error': self.error,
+            'retry_count': self.retry_count,
+            'metadata': _to_plain(self.metadata)
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'JobStepState':
         """Create from dictionary"""
-        data['status'] = StepStatus(data['status'])
+        status = data['status']
+        # Unknown values still go through StepStatus() so they raise the usual ValueError
+        data['status'] = _STATUS_LOOKUP.get(status) or StepStatus(status)
         return cls(**data)
 
 
@@ -55,71 +92,95 @@ class JobState:
     last_error: Optional[str] = None
     created_at: str = ""
     updated_at: str = ""
+    # Position of each step_id in steps (first occurrence wins, like the old linear scans)
+    _id_index: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # No step before this index is pending or failed
+    _next_index: int = field(default=0, init=False, repr=False, compare=False)
+    # Number of completed steps, kept in sync by the mark_step_* methods
+    _completed_count: int = field(default=0, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         """Initialize after creation"""
-        if not self.created_at:
-            self.created_at = datetime.utcnow().isoformat()
-        if not self.updated_at:
-            self.updated_at = datetime.utcnow().isoformat()
+        if not self.created_at or not self.updated_at:
+            now = datetime.utcnow().isoformat()
+            if not self.created_at:
+                self.created_at = now
+            if not self.updated_at:
+                self.updated_at = now
         if not self.total_steps:
             self.total_steps = len(self.steps)
+        for i, step in enumerate(self.steps):
+            self._id_index.setdefault(step.step_id, i)
+            if step.status == StepStatus.COMPLETED:
+                self._completed_count += 1
     
     def get_next_step(self) -> Optional[JobStepState]:
         """Get the next step to execute"""
-        for step in self.steps:
-            if step.status in [StepStatus.PENDING, StepStatus.FAILED]:
+        # Resume the scan where the last one stopped; mark_step_failed moves it back if needed
+        for i in range(self._next_index, len(self.steps)):
+            step = self.steps[i]
+            if step.status in (StepStatus.PENDING, StepStatus.FAILED):
+                self._next_index = i
                 return step
+        self._next_index = len(self.steps)
         return None
     
     def mark_step_started(self, step_id: str) -> None:
         """Mark a step as started"""
-        for step in self.steps:
-            if step.step_id == step_id:
-                step.status = StepStatus.IN_PROGRESS
-                step.started_at = datetime.utcnow().isoformat()
-                break
-        self.updated_at = datetime.utcnow().isoformat()
+        now = datetime.utcnow().isoformat()
+        step = self.get_step_by_id(step_id)
+        if step is not None:
+            self._set_step_status(step, StepStatus.IN_PROGRESS)
+            step.started_at = now
+        self.updated_at = now
     
     def mark_step_completed(self, step_id: str, metadata: Optional[Dict] = None) -> None:
         """Mark a step as completed"""
-        for i, step in enumerate(self.steps):
-            if step.step_id == step_id:
-                step.status = StepStatus.COMPLETED
-                step.completed_at = datetime.utcnow().isoformat()
-                if metadata:
-                    step.metadata.update(metadata)
-                self.current_step_index = i + 1
-                break
-        self.updated_at = datetime.utcnow().isoformat()
+        now = datetime.utcnow().isoformat()
+        i = self._id_index.get(step_id)
+        if i is not None:
+            step = self.steps[i]
+            self._set_step_status(step, StepStatus.COMPLETED)
+            step.completed_at = now
+            if metadata:
+                step.metadata.update(metadata)
+            self.current_step_index = i + 1
+        self.updated_at = now
     
     def mark_step_failed(self, step_id: str, error: str) -> None:
         """Mark a step as failed"""
-        for step in self.steps:
-            if step.step_id == step_id:
-                step.status = StepStatus.FAILED
-                step.error = error
-                step.retry_count += 1
-                break
+        i = self._id_index.get(step_id)
+        if i is not None:
+            step = self.steps[i]
+            self._set_step_status(step, StepStatus.FAILED)
+            step.error = error
+            step.retry_count += 1
+            self._next_index = min(self._next_index, i)
         self.last_error = error
         self.can_resume = True
         self.updated_at = datetime.utcnow().isoformat()
     
+    def _set_step_status(self, step: JobStepState, status: StepStatus) -> None:
+        """Change a step's status, keeping the completed-step count in sync"""
+        self._completed_count += (status == StepStatus.COMPLETED) - (step.status == StepStatus.COMPLETED)
+        step.status = status
+    
     def get_completed_steps(self) -> List[JobStepState]:
         """Get all completed steps"""
         return [s for s in self.steps if s.status == StepStatus.COMPLETED]
     
+    def get_completed_count(self) -> int:
+        """Get the number of completed steps"""
+        return self._completed_count
+    
     def get_progress_percentage(self) -> float:
         """Calculate job progress percentage"""
-        completed = len([s for s in self.steps if s.status == StepStatus.COMPLETED])
-        return (completed / self.total_steps) * 100 if self.total_steps > 0 else 0
+        return (self._completed_count / self.total_steps) * 100 if self.total_steps > 0 else 0
     
     def get_step_by_id(self, step_id: str) -> Optional[JobStepState]:
         """Get a step by ID"""
-        for step in self.steps:
-            if step.step_id == step_id:
-                return step
-        return None
+        i = self._id_index.get(step_id)
+        return self.steps[i] if i is not None else None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -143,8 +204,22 @@ class JobState:
     
     def save(self, filepath: str) -> None:
         """Save state to file"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, indent=2)
+        self.save_dict(self.to_dict(), filepath)
+    
+    @staticmethod
+    def save_dict(data: Dict[str, Any], filepath: str) -> None:
+        """Save a state snapshot taken with to_dict() to file"""
+        # Encode fully first so the file is written in one call
+        content = json.dumps(data, indent=2)
+        
+        # Write to a temp file and rename it over the old state, so a crash mid-write
+        # leaves the previous job_state.json intact for resume
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filepath)
     
     @classmethod
     def load(cls, filepath: str) -> 'JobState':
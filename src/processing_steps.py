@@ -2,15 +2,86 @@
 Processing Steps Definition
 Defines the actual steps for audiobook generation that can be tracked and resumed
 """
+import gc
 import os
 import time
+import threading
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 from step_registry import register_step
 from job_state import StepExecutionContext
 
 
+# The most recently finished job's TTS processor and the settings it was loaded with.
+# Loading IndexTTS2 takes far longer than most jobs' other steps, so the next job with
+# the same settings reuses it. Only one is kept, to bound the VRAM held between jobs.
+_idle_tts: Optional[Tuple[Tuple, Any]] = None
+_idle_tts_lock = threading.Lock()
+
+
+def _acquire_tts_processor(processor_cls, **settings):
+    """
+    Take the idle TTS processor if its settings match, or load a new one
+    
+    Args:
+        processor_cls: TTSProcessor class, used when a new processor must be loaded
+        **settings: TTSProcessor constructor arguments
+        
+    Returns:
+        Tuple of (settings key, TTSProcessor)
+    """
+    global _idle_tts
+    key = tuple(sorted(settings.items()))
+    with _idle_tts_lock:
+        idle = _idle_tts
+        if idle is not None and idle[0] == key:
+            _idle_tts = None
+        else:
+            idle = None
+    
+    if idle is not None:
+        print("  ♻️  Reusing loaded TTS model")
+        return key, idle[1]
+    
+    # Settings changed: free the old model's memory before loading the new one
+    release_idle_tts_processor()
+    return key, processor_cls(**settings)
+
+
+def _release_tts_processor(key: Tuple, processor) -> None:
+    """Keep a processor for the next job once its job is done with it"""
+    global _idle_tts
+    with _idle_tts_lock:
+        # A processor parked by a concurrent job takes precedence; this one is dropped
+        if _idle_tts is None:
+            _idle_tts = (key, processor)
+
+
+def release_idle_tts_processor() -> None:
+    """Drop the idle TTS processor and hand its cached VRAM back, e.g. before Ollama runs"""
+    global _idle_tts
+    with _idle_tts_lock:
+        idle, _idle_tts = _idle_tts, None
+    if idle is None:
+        return
+    
+    del idle
+    _reclaim_tts_memory()
+
+
+def _reclaim_tts_memory() -> None:
+    """Collect a dropped TTS model and release PyTorch's cached GPU blocks to the driver"""
+    # The model graph can hold reference cycles, so collect before emptying the cache
+    gc.collect()
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
 @register_step(
     step_id="extract_text",
     step_name="Extract Text from Source",
@@ -58,6 +129,9 @@ def ollama_processing_step(context: StepExecutionContext) -> Dict[str, Any]:
     if not use_ollama:
         return {'skipped': True, 'reason': 'Ollama not enabled'}
     
+    # Ollama needs the VRAM an idle TTS model from an earlier job would still hold
+    release_idle_tts_processor()
+    
     # Get text from previous step
     extract_result = context.get_previous_step_result('extract_text')
     if not extract_result:
@@ -218,7 +292,7 @@ def segment_text_step(context: StepExecutionContext) -> Dict[str, Any]:
         import json
         segments_file = Path(context.work_dir) / "character_segments.json"
         with open(segments_file, 'w', encoding='utf-8') as f:
-            json.dump([seg.__dict__ for seg in character_segments], f, indent=2)
+            json.dump([seg.to_dict() for seg in character_segments], f, indent=2)
         
         return {
             'character_segments': character_segments,
@@ -293,7 +367,10 @@ def generate_audio_step(context: StepExecutionContext) -> Dict[str, Any]:
     use_cuda_kernel = not context.job_data.get('no_cuda_kernel', False)
     use_deepspeed = context.job_data.get('use_deepspeed', False)
     
-    tts_processor = TTSProcessor(
+    # Reuse a model loaded by an earlier job; a processor is only kept for the next
+    # job on success, so one that raised mid-generation is never shared
+    tts_key, tts_processor = _acquire_tts_processor(
+        TTSProcessor,
         cfg_path=config_path,
         model_dir=model_dir,
         use_fp16=use_fp16,
@@ -456,6 +533,7 @@ def generate_audio_step(context: StepExecutionContext) -> Dict[str, Any]:
     
     # Final progress save
     save_progress()
+    _release_tts_processor(tts_key, tts_processor)
     
     print(f"\n  ✓ Audio generation complete: {len(audio_files)} audio files generated")
     
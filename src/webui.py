@@ -512,7 +512,7 @@ def get_job_details(job_id: str) -> str:
         job_state = job_queue.get_job_state(full_job_id)
         if job_state and job_state.steps:
             progress = job_state.get_progress_percentage()
-            completed = len(job_state.get_completed_steps())
+            completed = job_state.get_completed_count()
             total = job_state.total_steps
             details += f"Progress: {completed}/{total} steps ({progress:.1f}%)\n"
             
@@ -613,7 +613,7 @@ def resume_failed_job(job_id: str) -> str:
         # Get job state to show what will be resumed
         job_state = job_queue.get_job_state(full_job_id)
         if job_state:
-            completed = len(job_state.get_completed_steps())
+            completed = job_state.get_completed_count()
             total = job_state.total_steps
             log_message(f"Resuming job {full_job_id} from step {completed + 1}/{total}")
         else:
@@ -734,6 +734,11 @@ def detect_characters_from_text(
         text = extractor.extract_text()
         current_epub_text = text
         
+        if use_ollama:
+            # Free the VRAM an idle TTS model from an earlier job would still hold
+            from processing_steps import release_idle_tts_processor
+            release_idle_tts_processor()
+        
         # Create analyzer
         current_analyzer = CharacterAnalyzer(
             use_ollama=use_ollama,